@@ -129,3 +129,15 @@ for inputStr in [inputStr1, inputStr2, inputStr3]:
 	openStates, allStates, pruneStats, result = g.run_tree_search(inputStr)
 	print(f'the input "{inputStr}" returned with result: {result}')
 	print(pruneStats)
+
+# when it's not clear which configuration suits the grammar, several can be raced in parallel,
+# the first one to decide wins and the others are stopped (by default all node precedence heuristics race)
+g.portfolio = [{'NTA+TM1': True}, {'WNTA+TM2': True}, {'TM3': True, 'RE': False}]
+for inputStr in [inputStr1, inputStr2, inputStr3]:
+	openStates, allStates, pruneStats, result = g.run_tree_search_portfolio(inputStr)
+	print(f'the input "{inputStr}" returned with result: {result} (decided by {g.portfolioWinner})')
+
+# long negative inputs make the tree search go through the whole state space,
+# the parallel search splits the states among processes (by default one per CPU core)
+openStates, allStates, pruneStats, result = g.run_tree_search_parallel(inputStr3, 4)
+print(f'the input "{inputStr3}" returned with result: {result}')
@@ -2,20 +2,30 @@
 # Project: WK Grammar Tree Search
 # Implementation of the main grammar class - can run WK-CYK or parse tree
 
+from collections import defaultdict
 from itertools import combinations
+from heapq import heapify, heappush, heappop
 from typing import Dict, List, Tuple, Set, Union, Optional, TypeVar, Any, Callable, Generator
-from queue import PriorityQueue
-from copy import deepcopy
 import time
-import re
+import os
+import sys
+import multiprocessing
+import queue
+
+from lib.goal_index import cGoalIndex, CACHE_SIZE
+from lib.wk_cyk_numpy import cNumpyWkCyk, np
+from lib.frontiers import cHeapFrontier, cBucketFrontier, cFifoFrontier, cPriorityQueueFrontier
 
 # typings
 tNonTerm = str
 tTerm = str
-tTermLetter = Tuple[List[tTerm], List[tTerm]]
+tTermLetter = Tuple[Tuple[tTerm, ...], Tuple[tTerm, ...]]
 tLetter = TypeVar('tLetter')
 tWord = List[tLetter]
 tRelation = Tuple[tTerm, tTerm]
+tCompactLetter = Union[int, Tuple[str, str]]   # nonterm id or (upper, lower) strings
+tCompactWord = Tuple[tCompactLetter, ...]      # word as used by the tree search
+tSegment = Tuple[str, str]                     # (upper, lower) strings of a term segment
 t4DInt = Tuple[int, int, int, int]
 
 # helper functions
@@ -49,39 +59,115 @@ def wordToStr(word: tWord) -> str:
 
 	return(f'{" ".join(rs)}')
 
+# one letter of an immutable linked list - the part of a word behind the terminal prefix
+# successors share the untouched rest of the word with their parent
+class cWordCell:
+	__slots__ = ('letter', 'next', 'hashNo', 'upperCnt', 'reGoal', 'reStart', 'tmGoal', 'tmStates')
+
+	def __init__(self, letter: tCompactLetter, next: Optional['cWordCell']) -> None:
+		self.letter = letter   # nonterm id or non-empty term segment
+		self.next = next       # rest of the word, None at the end
+		self.hashNo = hash((letter, next.hashNo if next is not None else 0))
+		# count of upper strand terms from this cell to the end of the word
+		self.upperCnt = (len(letter[0]) if is_term(letter) else 0) + (next.upperCnt if next is not None else 0)
+		# cached by the RE pruning - input for which reStart was computed ...
+		self.reGoal: Optional[str] = None
+		# ... and the rightmost input idx the word from this cell on can start to match at (-1 if none)
+		self.reStart = -1
+		# cached by the TM node precedences - input for which tmStates were computed ...
+		self.tmGoal: Optional[str] = None
+		# ... and the states of the word from this cell on matched from an input idx - (heuristic, idx): state
+		self.tmStates: Optional[Dict[Tuple[int, int], Any]] = None
+
+	def __hash__(self) -> int:
+		return self.hashNo
+
+	# structural equality, shared parts of the lists are skipped by the identity check
+	def __eq__(self, other: object) -> bool:
+		if not isinstance(other, cWordCell):
+			return NotImplemented
+		a: Optional[cWordCell] = self
+		b: Optional[cWordCell] = other
+		while a is not b:
+			if a is None or b is None or a.hashNo != b.hashNo or a.letter != b.letter:
+				return False
+			a, b = a.next, b.next
+		return True
+
 # a node in the search tree
+# the word is split into the terminal prefix (head) and the list starting with the first nonterm (tail)
 class cTreeNode:
-	def __init__(self, word: tWord, upperStrLen: int, lowerStrLen: int, ntLen: int, parent: Optional['cTreeNode'], precedence: int) -> None:
-		self.word = word
+	def __init__(self, head: tSegment, tail: Optional[cWordCell], upperStrLen: int, lowerStrLen: int, ntLen: int, parent: Optional['cTreeNode'], precedence: int, rule: Optional['cSearchRule'] = None) -> None:
+		self.head = head               # leading term segment, ('', '') if the word starts with a nonterm
+		self.tail = tail               # rest of the word, None if the word is terminal
 		self.upperStrLen = upperStrLen # count of terminals in the upper strand
 		self.lowerStrLen = lowerStrLen # count of terminals in the lower strand
 		self.ntLen = ntLen             # sum of length of all nonterms
 		self.parent = parent           # parent node
-		self.hashNo = hash(str(word))
+		self.key = (head, tail)        # state identity, compared on hash collisions
+		self.hashNo = hash(self.key)
 		self.precedence = precedence   # value given by node precedence heuristic
+		self.rule = rule               # rule which rewrote the parent into this node
+		self.ntCnt = 0                 # count of nonterms
+		self.ntDist = 0                # sum of distances of nonterms
+		self.precState: Any = None     # cached by the active node precedence heuristic, used by the children
 
 	def __hash__(self) -> int:
 		return self.hashNo
 
-	# eq and lt needed for priority queue, sorting done by precedence
-	def __eq__(self, other: object) -> bool:
-		if not isinstance(other, cTreeNode):
-			return NotImplemented
-		return self.precedence == other.precedence
-
-	def __lt__(self, other: 'cTreeNode') -> bool:
-		return self.precedence < other.precedence
+	# letters of the word, the empty head is left out
+	def letters(self) -> Generator:
+		if self.head[0] or self.head[1]:
+			yield self.head
+		cell = self.tail
+		while cell is not None:
+			yield cell.letter
+			cell = cell.next
+
+	# the word as a flat compact word
+	@property
+	def word(self) -> tCompactWord:
+		return tuple(self.letters())
+
+# a rule compiled for the tree search, with the data needed to update a node without rescanning the word
+class cSearchRule:
+	__slots__ = ('rhs', 'upperCnt', 'lowerCnt', 'ntsLen', 'upper', 'ntCnt', 'ntDist', 'distDelta')
+
+	def __init__(self, rhs: tCompactWord, upperCnt: int, lowerCnt: int, ntsLen: int, ntDistances: List[int], lhs: int) -> None:
+		self.rhs = rhs               # compact right side
+		self.upperCnt = upperCnt     # terms cnt in upper ...
+		self.lowerCnt = lowerCnt     # .. and lower strand
+		self.ntsLen = ntsLen         # change of the sum of nonterms lengths
+		self.upper = ''.join(letter[0] for letter in rhs if is_term(letter))   # the upper strand of the rhs
+		self.ntCnt = sum(1 for letter in rhs if is_nonterm(letter))           # nonterms in the rhs
+		self.ntDist = sum(ntDistances[letter] for letter in rhs if is_nonterm(letter))
+		self.distDelta = self.ntDist - ntDistances[lhs]                      # change of the sum of distances
 
 # a rule of a grammar
+# the rules are immutable values - the right side is a tuple, term letters are tuples of two tuples
+# (they are given as lists and converted), so the rules can be shared by the forms of the grammar
+# the attributes can't be set after __init__, the snapshots and get_wk_cnf cache rely on it
 class cRule:
+	__slots__ = ('lhs', 'rhs', 'upperCnt', 'lowerCnt', 'hashNo')
+
 	def __init__(self, lhs: tNonTerm, rhs: tWord) -> None:
-		self.lhs = lhs                   # rule's left side (nonterm)
-		self.rhs = self.compactize(rhs)  # rule's right side
-		self.ntsLen = 0                  # sum of all nonterms lengths
-		self.upperCnt = 0                # terms cnt in upper ...
-		self.lowerCnt = 0                # .. and lower strand
+		rhs = tuple(self.compactize([(tuple(letter[0]), tuple(letter[1])) if is_term(letter) else letter for letter in rhs]))
+		upperCnt, lowerCnt = self.calculate_cnts(rhs)
+		object.__setattr__(self, 'lhs', lhs)                       # rule's left side (nonterm)
+		object.__setattr__(self, 'rhs', rhs)                       # rule's right side
+		object.__setattr__(self, 'upperCnt', upperCnt)             # terms cnt in upper ...
+		object.__setattr__(self, 'lowerCnt', lowerCnt)             # .. and lower strand
+		object.__setattr__(self, 'hashNo', hash((lhs, rhs)))
+
+	def __setattr__(self, name: str, value: Any) -> None:
+		raise AttributeError(f'rule {self} is immutable, {name} can not be set')
+
+	def __delattr__(self, name: str) -> None:
+		raise AttributeError(f'rule {self} is immutable, {name} can not be deleted')
 
-		self.calculate_cnts()
+	# copied and pickled by the constructor
+	def __reduce__(self) -> Tuple[type, Tuple[tNonTerm, tWord]]:
+		return cRule, (self.lhs, self.rhs)
 
 	# makes rules compact: A -> (a lambda)(lambda a) == A -> (a a)
 	def compactize(self, word: tWord) -> tWord:
@@ -96,17 +182,15 @@ class cRule:
 				i += 1
 		return word
 
-	# count terms and nonterms
-	def calculate_cnts(self):
-		self.ntsLen = 0
-		self.upperCnt = 0
-		self.lowerCnt = 0
-		for letter in self.rhs:
+	# count terms in upper and lower strand
+	def calculate_cnts(self, rhs: tWord) -> Tuple[int, int]:
+		upperCnt = 0
+		lowerCnt = 0
+		for letter in rhs:
 			if is_term(letter):
-				self.upperCnt += len(letter[0])
-				self.lowerCnt += len(letter[1])
-			else:
-				self.ntsLen += 1
+				upperCnt += len(letter[0])
+				lowerCnt += len(letter[1])
+		return upperCnt, lowerCnt
 
 
 	def __eq__(self, other):
@@ -118,10 +202,14 @@ class cRule:
 	__repr__ = __str__
 
 	def __hash__(self) -> int:
-		return hash((self.lhs, str(self.rhs)))
+		return self.hashNo
 
 # the grammar itself
 class cWK_CFG:
+	# the rules, symbols and everything precalculate_data computes from them - a form of the grammar
+	formAttributes = ('rules', 'nts', 'ts', 'ruleDict', 'relDict', 'erasableNts', 'ntDistances', 'termsFromNts',
+					  'ruleNtsLens', 'ntNames', 'ntIds', 'ntIdDistances', 'searchRules')
+
 	def __init__(self, nts: List[tNonTerm], ts: List[tTerm], startSymbol: tNonTerm, rules: List[cRule], relation: List[tRelation]) -> None:
 		self.nts = set(nts)                       # set of terms
 		self.ts = set(ts)                         # set of nonterms
@@ -131,6 +219,8 @@ class cWK_CFG:
 		self.erasableNts: Set[tNonTerm] = set()   # nonterms that can be erased by lambda-rules
 		self.lastCreatedNonTerm = 0               # dynamically created non-term last index
 		self.timeLimit = 10                       # max computation time before timeout
+		self.wkCykRelationCheck = False           # WK-CYK rejects inputs with symbols not complementary to themselves
+		self.wkCnfCache: Optional[Tuple[Set[cRule], 'cWK_CFG']] = None   # (rules it was made from, get_wk_cnf result)
 
 		# pruning heuristics - which are active
 		self.pruningOptions: Dict[Callable, bool] = {
@@ -141,6 +231,16 @@ class cWK_CFG:
 			self.prune_check_regex: True
 		}
 
+		# pruning heuristics - variants only checking what changed against the parent node
+		# (the parent has already passed the same checks)
+		self.pruningIncremental: Dict[Callable, Callable] = {
+			self.prune_check_strands_len: self.prune_check_strands_len,
+			self.prune_check_total_len: self.prune_check_total_len,
+			self.prune_check_word_start: self.prune_check_word_start_incremental,
+			self.prune_check_relation: self.prune_check_relation_incremental,
+			self.prune_check_regex: self.prune_check_regex_incremental
+		}
+
 		# pruning heuristics - how many times successful
 		self.pruneCnts: Dict[Callable, int] = {
 			self.prune_check_strands_len: 0,
@@ -150,6 +250,13 @@ class cWK_CFG:
 			self.prune_check_regex: 0
 		}
 
+		# index of the input of the current search, used by pruning and node precedence
+		self.goalIndex: Optional[cGoalIndex] = None
+
+		# RE pruning results of word shapes - (input, fixed pieces, is the end anchored), cleared with every search
+		# and when it has CACHE_SIZE entries
+		self.regexCache: Dict[Tuple[str, Tuple[str, ...], bool], bool] = {}
+
 		# idx of active node precedence, NTA+TM1 (index 5) is the default one
 		self.currentNodePrecedence = 5
 
@@ -169,6 +276,22 @@ class cWK_CFG:
 			('NONE', self.compute_precedence_no_heuristic)
 		]
 
+		# configurations raced by the portfolio tree search - heuristic names passed to activate (name: value)
+		# by default every node precedence heuristic with the current pruning
+		self.portfolio: List[Dict[str, bool]] = [{name: True} for name, _ in self.nodePrecedenceList]
+		self.portfolioWinner: Optional[Dict[str, bool]] = None   # configuration that decided the last portfolio search
+
+		# idx of active open list, heap is the default one
+		self.currentFrontier = 0
+
+		# open lists of the tree search - name and class
+		self.frontierList = [
+			('HEAP', cHeapFrontier),
+			('BUCKET', cBucketFrontier),
+			('FIFO', cFifoFrontier),
+			('PQ', cPriorityQueueFrontier)
+		]
+
 		# does the definition make sense?
 		if not self.is_consistent():
 			raise ValueError
@@ -179,18 +302,15 @@ class cWK_CFG:
 ################# function for init, backup and precalcualtions   ##########################################
 
 	# backups and restores a form of the grammar - can reverse to_wk_cnf
+	# the snapshot only holds references - the transformations and precalculations never change these objects,
+	# they create new ones, so the precalculated data are restored together with the rules
 	def backup(self) -> None:
-		self.rulesBackup = deepcopy(self.rules)
-		self.ntsBackup = self.nts.copy()
-		self.tsBackup = self.ts.copy()
+		self.formBackup = {name: getattr(self, name) for name in self.formAttributes}
 
 
 	def restore(self) -> None:
-		self.rules = self.rulesBackup
-		self.nts = self.ntsBackup
-		self.ts = self.tsBackup
-
-		self.precalculate_data()
+		for name, value in self.formBackup.items():
+			setattr(self, name, value)
 
 
 	# check grammar definition consistecy
@@ -212,15 +332,15 @@ class cWK_CFG:
 			if rule.lhs not in self.nts:
 				print(f'rule left-hand side {rule.lhs} not found among non-terminals')
 				return False
-			for letter in rule.lhs:
+			for letter in rule.rhs:
 				if is_nonterm(letter):
 					if letter not in self.nts:
-						print(f'rule rhs symbol {rule.lhs} not found among non-terminals')
+						print(f'rule rhs symbol {letter} not found among non-terminals')
 						return False
 				else:
 					for symbol in letter[0] + letter[1]:
 						if symbol not in self.ts:
-							print(f'rule rhs symbol {rule.lhs} not found among terminals')
+							print(f'rule rhs symbol {symbol} not found among terminals')
 							return False
 
 		# are all symbols in the relation among terminas?
@@ -240,6 +360,7 @@ class cWK_CFG:
 		self.calc_nt_distances()
 		self.calc_min_terms_from_nt()
 		self.calc_rules_nt_lens()
+		self.generate_search_rules()
 
 
 	# parse rules and create rule dictionary for more efficient access
@@ -261,109 +382,127 @@ class cWK_CFG:
 			self.relDict[a] += b
 
 
-	# can all letters in the word be erased bu a lambda rule
-	# helper function - called only from find_erasable_nts
-	def _is_word_erasable(self, word: tWord) -> bool:
-		for letter in word:
-			# non-terminals must be in the erasableNts set to be erasable
-			if is_nonterm(letter) and letter not in self.erasableNts:
-				return False
-			# terminals must be empty
-			elif letter != ([], []):
-				return False
+	# the fixpoint engine of the precalculations and transformations - the minimal value of every nonterm
+	# that generates a terminal string, where a rule gives its left side the sum of the values of its
+	# right side nonterms plus ruleCost(rule) (rules with the cost None are not used)
+	# the nonterms are finished in the order of their values (Knuth's generalization of Dijkstra's algorithm),
+	# every rule is indexed by the nonterms on its right side and waits until all of them are finished,
+	# so each rule is visited once per nonterm occurrence - nonterms not in the result never get a value
+	def _rule_fixpoint(self, ruleCost: Callable[[cRule], Optional[int]]) -> Dict[tNonTerm, int]:
+		values: Dict[tNonTerm, int] = {}
+		heap: List[Tuple[int, tNonTerm]] = []        # rules without nonterms give the first values
+		rules: List[Tuple[cRule, int, List[tNonTerm]]] = []
+		for rule in self.rules:
+			cost = ruleCost(rule)
+			if cost is not None:
+				nts = [letter for letter in rule.rhs if is_nonterm(letter)]
+				if nts:
+					rules.append((rule, cost, nts))
+				else:
+					heap.append((cost, rule.lhs))
+		if not heap:
+			return values
+		heapify(heap)
+
+		ruleUses: Dict[tNonTerm, List[int]] = {}     # nonterm -> rules with it on the right side (once per occurrence)
+		waiting: List[int] = []                      # rule -> count of its right side nonterms not finished yet
+		sums: List[int] = []                         # rule -> value so far
+		lhss: List[tNonTerm] = []
+		for ruleIdx, (rule, cost, nts) in enumerate(rules):
+			for nt in nts:
+				ruleUses.setdefault(nt, []).append(ruleIdx)
+			waiting.append(len(nts))
+			sums.append(cost)
+			lhss.append(rule.lhs)
+
+		while heap:
+			value, nt = heappop(heap)
+			if nt in values:
+				continue
+			values[nt] = value
+			for ruleIdx in ruleUses.get(nt, []):
+				sums[ruleIdx] += value
+				waiting[ruleIdx] -= 1
+				if not waiting[ruleIdx] and lhss[ruleIdx] not in values:
+					heappush(heap, (sums[ruleIdx], lhss[ruleIdx]))
 
-		return True
+		return values
 
 
 	# make a set of all nonterms that can be erased by lambda-rules
+	# (the rules with only empty term letters and erasable nonterms)
 	def find_erasable_nts(self) -> None:
-		self.erasableNts = set()
-
-		# continue looping until there is no new addition to the set
-		loop = True
-		while loop:
-			loop = False
-			for rule in self.rules:
-				if self._is_word_erasable(rule.rhs) and rule.lhs not in self.erasableNts:
-					# found a new addition - will continue looping
-					loop = True
-					self.erasableNts.add(rule.lhs)
-
-
-	#
-	def _calc_word_distance(self, word: tWord) -> int:
-		maxVal = 0
-		for letter in word:
-			if is_nonterm(letter):
-				maxVal += self.ntDistances[letter]
-				#maxVal = max(maxVal, self.ntDistances[letter])
-		return maxVal
+		self.erasableNts = set(self._rule_fixpoint(lambda rule: 0 if all(is_nonterm(letter) or letter == ((), ()) for letter in rule.rhs) else None))
 
 
 	# computes minimum number of rules for each nonterminal which lead to terminal string
 	def calc_nt_distances(self) -> None:
 		MAX_DIST = 20
-		self.ntDistances: Dict[tNonTerm, int] = {}
-
-		# init the dictionary with maximum distance
-		for nt in self.nts:
-			self.ntDistances[nt] = MAX_DIST
+		distances = self._rule_fixpoint(lambda rule: 1)
+		self.ntDistances: Dict[tNonTerm, int] = {nt: min(distances.get(nt, MAX_DIST), MAX_DIST) for nt in self.nts}
 
-		# continue looping until there is no decrement
-		loop = True
-		while loop:
-			loop = False
-			for rule in self.rules:
-				distance = self._calc_word_distance(rule.rhs) + 1
-				if distance < self.ntDistances[rule.lhs]:
-					# decrement found - continue looping
-					self.ntDistances[rule.lhs] = distance
-					loop = True
 
-	# calculates how many terminal can be generated from a word
+	# calculates how many terminal can be generated from a word - its term letters
 	# helper function - only called from calc_min_terms_from_nt
 	def _calc_terms_from_word(self, word: tWord) -> int:
-		retVal = 0
-		for letter in word:
-			if is_term(letter):
-				# for term segments simply count the terminals
-				retVal += len(letter[0]) + len(letter[1])
-			else:
-				# for nonterminals count with their current value
-				retVal += self.termsFromNts[letter]
-		return retVal
+		return sum(len(letter[0]) + len(letter[1]) for letter in word if is_term(letter))
 
 
 	# calculates minimum amount of terminals that each non-terminal can generates
 	def calc_min_terms_from_nt(self):
 		MAX_TERMS = 20
-		self.termsFromNts: Dict[tNonTerm, int] = {}
-
-		# init the dictionary with max values
-		for nt in self.nts:
-			self.termsFromNts[nt] = MAX_TERMS
-
-		# loop until there is no change
-		loop = True
-		while loop:
-			loop = False
-			for rule in self.rules:
-				termsCnt = self._calc_terms_from_word(rule.rhs)
-				if termsCnt < self.termsFromNts[rule.lhs]:
-					# decrement has been found - continue looping
-					self.termsFromNts[rule.lhs] = termsCnt
-					loop = True
+		termsCnts = self._rule_fixpoint(lambda rule: self._calc_terms_from_word(rule.rhs))
+		self.termsFromNts: Dict[tNonTerm, int] = {nt: min(termsCnts.get(nt, MAX_TERMS), MAX_TERMS) for nt in self.nts}
 
 
 	# for each grammar rule calculate the rule non-terms len
+	# (kept by the grammar, the rules can be shared by grammars with different lens)
 	def calc_rules_nt_lens(self) -> None:
+		self.ruleNtsLens: Dict[cRule, int] = {}
 		for rule in self.rules:
 			# len of non term on the left is subtracted
-			rule.ntsLen = -self.termsFromNts[rule.lhs]
+			ntsLen = -self.termsFromNts[rule.lhs]
 			for letter in rule.rhs:
 				# len of all nonterms on the right is added
 				if is_nonterm(letter):
-					rule.ntsLen += self.termsFromNts[letter]
+					ntsLen += self.termsFromNts[letter]
+			self.ruleNtsLens[rule] = ntsLen
+
+	# number the nonterms and compile the rules into the compact form used by the tree search
+	def generate_search_rules(self) -> None:
+		self.ntNames: List[tNonTerm] = sorted(self.nts)
+		self.ntIds: Dict[tNonTerm, int] = {nt: idx for idx, nt in enumerate(self.ntNames)}
+		self.ntIdDistances: List[int] = [self.ntDistances[nt] for nt in self.ntNames]
+
+		# for each nonterm id a list of its compiled rules
+		self.searchRules: List[List[cSearchRule]] = [[] for _ in self.ntNames]
+		for rule in self.rules:
+			lhs = self.ntIds[rule.lhs]
+			self.searchRules[lhs].append(cSearchRule(self.compact_word(rule.rhs), rule.upperCnt, rule.lowerCnt, self.ruleNtsLens[rule], self.ntIdDistances, lhs))
+
+
+	# convert a word to the compact form - nonterms become ids, term segments pairs of strings
+	def compact_word(self, word: tWord) -> tCompactWord:
+		return tuple((''.join(letter[0]), ''.join(letter[1])) if is_term(letter) else self.ntIds[letter] for letter in word)
+
+
+	# split a flat compact word into the terminal head and the linked tail used by cTreeNode
+	def split_word(self, word: tCompactWord) -> Tuple[tSegment, Optional[cWordCell]]:
+		head, idx = ('', ''), 0
+		while idx < len(word) and is_term(word[idx]):
+			head = (head[0] + word[idx][0], head[1] + word[idx][1])
+			idx += 1
+
+		tail = None
+		for letter in reversed(word[idx:]):
+			if is_nonterm(letter) or letter[0] or letter[1]:
+				tail = cWordCell(letter, tail)
+		return head, tail
+
+
+	# convert a compact word back, mostly to print it
+	def expand_word(self, word: tCompactWord) -> tWord:
+		return [(list(letter[0]), list(letter[1])) if is_term(letter) else self.ntNames[letter] for letter in word]
 
 ################# function for tree search           #######################################################
 
@@ -375,25 +514,20 @@ class cWK_CFG:
 	#                   4. actual result - True, False, None
 	def run_tree_search(self, upperStr: str) -> Tuple[int, int, List[Tuple[str, int]], Optional[bool]]:
 
-		# all pruning active on default
-		for key in self.pruneCnts:
-			self.pruneCnts[key] = 0
-
-		# create the root node
-		distance = self.compute_precedence([self.startSymbol], upperStr)
-		initNode = cTreeNode([self.startSymbol], 0, 0, self.termsFromNts[self.startSymbol], None, distance)
+		# reset the statistics and the input data, create the root node
+		initNode = self._init_search(upperStr)
 
-		# init the prio queue and the closed states set
-		openQueue: Any = PriorityQueue()
+		# init the open list and the closed states set
+		openQueue: Any = self.frontierList[self.currentFrontier][1]()
 		openQueue.put(initNode)
-		openQueueLen, openQueueMaxLen = 1, 1
-		allStates: Set[int] = set()
-		allStates.add(initNode.hashNo)
+		openQueueMaxLen = 1
+		allStates: Set[Tuple[tSegment, Optional[cWordCell]]] = set()
+		allStates.add(initNode.key)
 
 		startTime = time.time()
 
 		# loop until open queue is empty, solution has been found or time limit reached
-		while not openQueue.empty():
+		while len(openQueue) > 0:
 			# check the time limit, if exceeded, stop and return None
 			currentTime = time.time()
 			if currentTime - startTime > self.timeLimit:
@@ -401,57 +535,418 @@ class cWK_CFG:
 
 			# get another node with highest priority
 			currentNode = openQueue.get()
-			openQueueLen -= 1
 
 			# generate all possible sucessors (pruning happens within get_all_successors)
 			for nextNode in self.get_all_successors(currentNode, upperStr):
 				# check if the node is by chance the solution, if so, return True
-				if self.is_result(nextNode.word, upperStr):
+				if self.is_result(nextNode, upperStr):
 					self.printPath(nextNode)
 					return openQueueMaxLen, len(allStates), list(map(lambda key: (key.__name__, self.pruneCnts[key]), self.pruneCnts.keys())), True
 				# if the current node new, add it to the queue
-				if nextNode.hashNo not in allStates:
-					openQueueLen += 1
-					openQueueMaxLen = max(openQueueMaxLen, openQueueLen)
+				if nextNode.key not in allStates:
 					openQueue.put(nextNode)
-					allStates.add(nextNode.hashNo)
+					openQueueMaxLen = max(openQueueMaxLen, len(openQueue))
+					allStates.add(nextNode.key)
 
 		# queue empty, solution not found - return False
 		return openQueueMaxLen, len(allStates), list(map(lambda key: (key.__name__, self.pruneCnts[key]), self.pruneCnts.keys())), False
 
 
+	# reset the data of the previous search, returns the root node
+	def _init_search(self, upperStr: str) -> cTreeNode:
+		# all pruning active on default
+		for key in self.pruneCnts:
+			self.pruneCnts[key] = 0
+		self.regexCache.clear()
+		self.goalIndex = cGoalIndex(upperStr)
+
+		# create the root node
+		initNode = cTreeNode(('', ''), cWordCell(self.ntIds[self.startSymbol], None), 0, 0, self.termsFromNts[self.startSymbol], None, 0)
+		self.init_node(initNode, upperStr)
+		return initNode
+
+
+	# count of the worker processes of the parallel methods - the cpu count if not given
+	def worker_cnt(self, workers: Optional[int]) -> int:
+		if workers is None:
+			return os.cpu_count() or 1
+		if workers < 1:
+			raise ValueError(f'at least one worker process is needed, {workers} given')
+		return workers
+
+
+	# portfolio mode - runs the tree search with several configurations (self.portfolio by default) at once,
+	# each in its own process, returns the result of the first one that decides and stops the rest
+	# at most workers (cpu count by default) processes run at a time, the other configurations wait for a free slot
+	# (the time limit is wall clock time, the members must not share a core)
+	# the configuration that won is saved to portfolioWinner
+	# if processes can't be forked, the configurations are tried one after another
+	def run_tree_search_portfolio(self, upperStr: str, configs: Optional[List[Dict[str, bool]]] = None, workers: Optional[int] = None) -> Tuple[int, int, List[Tuple[str, int]], Optional[bool]]:
+		configs = self.portfolio if configs is None else configs
+		workers = self.worker_cnt(workers)
+		self.portfolioWinner = None
+
+		# the grammar isn't picklable (input generators), the processes get it by forking
+		try:
+			context = multiprocessing.get_context('fork')
+		except ValueError:
+			return self._run_portfolio_sequential(upperStr, configs)
+
+		results: Any = context.Queue()
+		processes = [context.Process(target=self._run_portfolio_member, args=(upperStr, config, idx, results), daemon=True) for idx, config in enumerate(configs)]
+		for process in processes[:workers]:
+			process.start()
+		started = min(workers, len(processes))
+
+		finalResult: Tuple[int, int, List[Tuple[str, int]], Optional[bool]] = (0, 0, [], None)
+		try:
+			for _ in processes:
+				# every member stops on its own after the time limit, the margin covers the process overhead
+				try:
+					idx, result = results.get(timeout=self.timeLimit + 10)
+				except queue.Empty:
+					break
+				if result is not None:
+					finalResult = result
+					if result[3] is not None:
+						self.portfolioWinner = configs[idx]
+						debug(f'portfolio won by {configs[idx]}')
+						break
+				# the member is done, its slot goes to the next configuration
+				if started < len(processes):
+					processes[started].start()
+					started += 1
+		finally:
+			for process in processes[:started]:
+				if process.is_alive():
+					process.terminate()
+			for process in processes[:started]:
+				process.join()
+			results.close()
+
+		return finalResult
+
+
+	# one process of the portfolio - set the configuration and search, sends (idx, result) back
+	def _run_portfolio_member(self, upperStr: str, config: Dict[str, bool], idx: int, results: Any) -> None:
+		result = None
+		try:
+			for name, value in config.items():
+				self.activate(name, value)
+			result = self.run_tree_search(upperStr)
+		finally:
+			results.put((idx, result))
+
+
+	# portfolio without processes - each configuration is tried until one decides, the settings are restored after
+	def _run_portfolio_sequential(self, upperStr: str, configs: List[Dict[str, bool]]) -> Tuple[int, int, List[Tuple[str, int]], Optional[bool]]:
+		savedPruning = self.pruningOptions.copy()
+		savedPrecedence, savedFrontier = self.currentNodePrecedence, self.currentFrontier
+
+		finalResult: Tuple[int, int, List[Tuple[str, int]], Optional[bool]] = (0, 0, [], None)
+		try:
+			for config in configs:
+				for name, value in config.items():
+					self.activate(name, value)
+				finalResult = self.run_tree_search(upperStr)
+				self.pruningOptions.update(savedPruning)
+				self.currentNodePrecedence, self.currentFrontier = savedPrecedence, savedFrontier
+				if finalResult[3] is not None:
+					self.portfolioWinner = config
+					break
+		finally:
+			self.pruningOptions.update(savedPruning)
+			self.currentNodePrecedence, self.currentFrontier = savedPrecedence, savedFrontier
+
+		return finalResult
+
+
+	# parallel tree search - the states are split among worker processes by the hash of the word,
+	# each worker keeps the open list and the closed states of its part and sends the successors it doesn't own
+	# to their owners, idle workers steal nodes from the busy ones
+	# the search ends when a result is found, the time limit is reached or no node is left anywhere
+	# (counted by the shared pending counter - nodes in the open lists and in messages)
+	# outputs the same 4-tuple as run_tree_search, the states are summed over the workers
+	def run_tree_search_parallel(self, upperStr: str, workers: Optional[int] = None) -> Tuple[int, int, List[Tuple[str, int]], Optional[bool]]:
+		workers = self.worker_cnt(workers)
+
+		# the grammar isn't picklable (input generators), the processes get it by forking
+		try:
+			context = multiprocessing.get_context('fork')
+		except ValueError:
+			return self.run_tree_search(upperStr)
+
+		inboxes = [context.Queue() for _ in range(workers)]
+		stealQueue: Any = context.Queue()
+		results: Any = context.Queue()
+		pending: Any = context.Value('q', 1)      # the root
+		idle: Any = context.Value('i', 0)         # count of workers without work
+		stop: Any = context.Value('b', False)     # set when the search is over
+
+		# the root goes to its owner
+		initNode = self._init_search(upperStr)
+		inboxes[initNode.hashNo % workers].put([self._flatten_node(initNode)])
+
+		processes = [context.Process(target=self._run_parallel_worker, args=(upperStr, idx, inboxes, stealQueue, pending, idle, stop, results), daemon=True) for idx in range(workers)]
+		for process in processes:
+			process.start()
+
+		openStates, allStates, prunes, finalResult = 0, 0, [(func.__name__, 0) for func in self.pruneCnts], False
+		try:
+			for _ in processes:
+				# every worker stops on its own after the time limit, the margin covers the process overhead
+				try:
+					workerResult = results.get(timeout=self.timeLimit + 10)
+				except queue.Empty:
+					finalResult = None
+					break
+				if workerResult is None:
+					finalResult = None
+					continue
+				workerOpen, workerAll, workerPrunes, workerDecision = workerResult
+				openStates += workerOpen
+				allStates += workerAll
+				prunes = [(name, cnt + workerCnt) for (name, cnt), (_, workerCnt) in zip(prunes, workerPrunes)]
+				if workerDecision:
+					finalResult = True
+				elif workerDecision is None and finalResult is not True:
+					finalResult = None
+		finally:
+			stop.value = True
+			for process in processes:
+				process.join(1)
+				if process.is_alive():
+					process.terminate()
+					process.join()
+			for q in inboxes + [stealQueue, results]:
+				q.close()
+
+		return openStates, allStates, prunes, finalResult
+
+
+	# node to a picklable tuple - (head, letters of the tail, upper strand len, lower strand len, nonterms len)
+	def _flatten_node(self, node: cTreeNode) -> Tuple[tSegment, tCompactWord, int, int, int]:
+		letters = []
+		cell = node.tail
+		while cell is not None:
+			letters.append(cell.letter)
+			cell = cell.next
+		return node.head, tuple(letters), node.upperStrLen, node.lowerStrLen, node.ntLen
+
+
+	# node received from another worker - it has no parent, its data are computed from the word
+	def _unflatten_node(self, flatNode: Tuple[tSegment, tCompactWord, int, int, int], goalStr: str) -> cTreeNode:
+		head, letters, upperStrLen, lowerStrLen, ntLen = flatNode
+		tail = None
+		for letter in reversed(letters):
+			tail = cWordCell(letter, tail)
+		node = cTreeNode(head, tail, upperStrLen, lowerStrLen, ntLen, None, 0)
+		self.init_node(node, goalStr)
+		return node
+
+
+	# one worker of the parallel tree search, sends (max open states, closed states, pruning statistics, result) back
+	def _run_parallel_worker(self, upperStr: str, workerIdx: int, inboxes: List[Any], stealQueue: Any, pending: Any, idle: Any, stop: Any, results: Any) -> None:
+		workerResult = None
+		try:
+			# unread messages are thrown away when the search ends, don't wait for them on exit
+			for q in inboxes + [stealQueue]:
+				q.cancel_join_thread()
+
+			self._init_search(upperStr)
+			inbox = inboxes[workerIdx]
+			workers = len(inboxes)
+			openQueue: Any = self.frontierList[self.currentFrontier][1]()
+			openQueueMaxLen = 0
+			allStates: Set[Tuple[tSegment, Optional[cWordCell]]] = set()
+			outboxes: List[List[Any]] = [[] for _ in range(workers)]
+			pendingDelta = 0    # change of the pending counter not yet published
+			isIdle = False
+			decision: Optional[bool] = False
+
+			startTime = time.time()
+
+			while not stop.value:
+				if time.time() - startTime > self.timeLimit:
+					decision = None
+					stop.value = True
+					break
+
+				# new nodes owned by this worker, the already known ones are dropped
+				while True:
+					try:
+						batch = inbox.get_nowait()
+					except queue.Empty:
+						break
+					for flatNode in batch:
+						node = self._unflatten_node(flatNode, upperStr)
+						if node.key in allStates:
+							pendingDelta -= 1
+						else:
+							allStates.add(node.key)
+							openQueue.put(node)
+
+				# nothing to do - steal a batch from the others, or check whether the search is over
+				if len(openQueue) == 0:
+					try:
+						batch = stealQueue.get_nowait()
+					except queue.Empty:
+						batch = None
+					if batch is None:
+						with pending.get_lock():
+							pending.value += pendingDelta
+							pendingDelta = 0
+							if pending.value == 0:
+								stop.value = True
+								break
+						if not isIdle:
+							with idle.get_lock():
+								idle.value += 1
+							isIdle = True
+						time.sleep(0.001)
+						continue
+					# stolen nodes are owned (and closed) by another worker, they are just expanded here
+					for flatNode in batch:
+						openQueue.put(self._unflatten_node(flatNode, upperStr))
+
+				if isIdle:
+					with idle.get_lock():
+						idle.value -= 1
+					isIdle = False
+
+				# expand a few nodes at once, so the shared counter isn't updated too often
+				expanded = 0
+				while len(openQueue) > 0 and expanded < 64 and decision is False:
+					currentNode = openQueue.get()
+					expanded += 1
+					for nextNode in self.get_all_successors(currentNode, upperStr):
+						if self.is_result(nextNode, upperStr):
+							self.printPath(nextNode)
+							decision = True
+							break
+						owner = nextNode.hashNo % workers
+						if owner != workerIdx:
+							outboxes[owner].append(self._flatten_node(nextNode))
+							pendingDelta += 1
+						elif nextNode.key not in allStates:
+							openQueue.put(nextNode)
+							allStates.add(nextNode.key)
+							pendingDelta += 1
+				openQueueMaxLen = max(openQueueMaxLen, len(openQueue))
+
+				if decision:
+					stop.value = True
+					break
+
+				# the sent nodes must be counted before anyone can expand them
+				with pending.get_lock():
+					pending.value += pendingDelta - expanded
+					pendingDelta = 0
+				for owner, outbox in enumerate(outboxes):
+					if outbox:
+						inboxes[owner].put(outbox)
+						outboxes[owner] = []
+
+				# someone is idle - give away a part of the open list
+				if idle.value > 0 and len(openQueue) > 1 and stealQueue.empty():
+					stealQueue.put([self._flatten_node(openQueue.get()) for _ in range(min(len(openQueue) // 2, 64))])
+
+			workerResult = (openQueueMaxLen, len(allStates), list(map(lambda key: (key.__name__, self.pruneCnts[key]), self.pruneCnts.keys())), decision)
+		finally:
+			if workerResult is None:
+				# failed - stop the others too
+				stop.value = True
+			results.put(workerResult)
+
+
 	# calls active pruning functions one by one, if false is returned, the node will be pruned
+	# a node with a parent is only checked incrementally
 	def is_word_feasible(self, node: cTreeNode, goalStr: str) -> bool:
+		incremental = node.parent is not None and node.rule is not None
 		for pruningFunc, pruningOptActive in self.pruningOptions.items():
-			if pruningOptActive and not pruningFunc(node, goalStr):
+			if not pruningOptActive:
+				continue
+			checkFunc = self.pruningIncremental[pruningFunc] if incremental else pruningFunc
+			if not checkFunc(node, goalStr):
 				debug(f'not feasible - check failed in {pruningFunc.__name__}')
 				self.pruneCnts[pruningFunc] += 1
 				return False
 		return True
 
 
+	# fill in the data of a node that has no parent to derive them from (root of the search)
+	def init_node(self, node: cTreeNode, goalStr: str) -> None:
+		node.ntCnt, node.ntDist = 0, 0
+		cell = node.tail
+		while cell is not None:
+			if is_nonterm(cell.letter):
+				node.ntCnt += 1
+				node.ntDist += self.ntIdDistances[cell.letter]
+			cell = cell.next
+		node.precedence = self.compute_precedence(node, goalStr)
+
+
 	# generates node successors
 	def get_all_successors(self, node: cTreeNode, goalStr: str) -> Generator:
-		for ntIdx, symbol in enumerate(node.word):
-			# find the first non terminal
-			if is_nonterm(symbol):
-				for rule in self.ruleDict[symbol]:
-					# apply every possible rule of the given non-term and create a node
-					newWord = self.apply_rule(node.word, ntIdx, rule.rhs)
-					newNode = cTreeNode(newWord, node.upperStrLen + rule.upperCnt, node.lowerStrLen + rule.lowerCnt, node.ntLen + rule.ntsLen, node, 0)
-					# if the node is not pruned, compute it's precedence and yield it
-					if self.is_word_feasible(newNode, goalStr):
-						newNode.precedence = self.compute_precedence(newWord, goalStr)
-						yield newNode
-				# since only the first non-terminal is supposed to be used, finish
-				return
-
-	# replace a nonterm with a rule right side within a word
+		# only the first non terminal is used, it starts the tail (no tail - nothing to rewrite)
+		if node.tail is None:
+			return
+		for rule in self.searchRules[node.tail.letter]:
+			# apply every possible rule of the given non-term and create a node
+			newNode = self.create_successor(node, rule)
+			# if the node is not pruned, compute it's precedence (from the parent's) and yield it
+			if self.is_word_feasible(newNode, goalStr):
+				newNode.precedence = self.compute_precedence(newNode, goalStr)
+				yield newNode
+
+
+	# node created by applying the rule to the first nonterm of the node
+	def create_successor(self, node: cTreeNode, rule: cSearchRule) -> cTreeNode:
+		head, tail = self.apply_rule_leftmost(node.head, node.tail, rule.rhs)
+		newNode = cTreeNode(head, tail, node.upperStrLen + rule.upperCnt, node.lowerStrLen + rule.lowerCnt, node.ntLen + rule.ntsLen, node, 0, rule)
+		newNode.ntCnt = node.ntCnt - 1 + rule.ntCnt
+		newNode.ntDist = node.ntDist + rule.distDelta
+		return newNode
+
+
+	# replace the first nonterm (the one starting the tail) with a rule right side
+	# only the rewritten letters are created, the rest of the tail is shared with the parent
+	# the head strings are copied when extended (and hashed again in the state key), so the cost is O(|head| + |rhs|)
+	def apply_rule_leftmost(self, head: tSegment, tail: cWordCell, ruleRhs: tCompactWord) -> Tuple[tSegment, Optional[cWordCell]]:
+		rest = tail.next
+		idx = 0
+
+		# term segments at the start of the rhs become part of the head
+		while idx < len(ruleRhs) and is_term(ruleRhs[idx]):
+			head = (head[0] + ruleRhs[idx][0], head[1] + ruleRhs[idx][1])
+			idx += 1
+
+		# rhs is terminal - the head also takes the term segment following the rewritten nonterm
+		if idx == len(ruleRhs):
+			if rest is not None and is_term(rest.letter):
+				head = (head[0] + rest.letter[0], head[1] + rest.letter[1])
+				rest = rest.next
+			return head, rest
+
+		# merge the last segment of the rhs with the following one
+		last = len(ruleRhs)
+		if is_term(ruleRhs[-1]) and rest is not None and is_term(rest.letter):
+			rest = cWordCell((ruleRhs[-1][0] + rest.letter[0], ruleRhs[-1][1] + rest.letter[1]), rest.next)
+			last -= 1
+
+		# prepend the rest of the rhs, empty segments are left out
+		for letter in reversed(ruleRhs[idx:last]):
+			if is_nonterm(letter) or letter[0] or letter[1]:
+				rest = cWordCell(letter, rest)
+
+		return head, rest
+
+	# replace any nonterm with a rule right side within a flat word
 	# needs to merge term segments if possible
-	def apply_rule(self, word: tWord, ntIdx: int, ruleRhs: tWord) -> tWord:
-		debug(f'\nword: {wordToStr(word)}')
+	def apply_rule(self, word: tCompactWord, ntIdx: int, ruleRhs: tCompactWord) -> tCompactWord:
+		debug(f'\nword: {wordToStr(self.expand_word(word))}')
 		debug(f'ntIdx: {ntIdx}')
-		debug(f'rule: {word[ntIdx] + " -> " + wordToStr(ruleRhs)}')
+		debug(f'rule: {self.ntNames[word[ntIdx]] + " -> " + wordToStr(self.expand_word(ruleRhs))}')
 
 		# we can merge with the previous letter if there is one and its terminal segment
 		mergePrev = ntIdx > 0 and is_term(word[ntIdx - 1])
@@ -466,20 +961,20 @@ class cWK_CFG:
 				# merge on both sides
 				mergedUpper = word[ntIdx - 1][0] + ruleRhs[0][0] + word[ntIdx + 1][0]
 				mergedLower = word[ntIdx - 1][1] + ruleRhs[0][1] + word[ntIdx + 1][1]
-				retval = word[:ntIdx - 1] + [(mergedUpper, mergedLower)] + word[ntIdx + 2:]
+				retval = word[:ntIdx - 1] + ((mergedUpper, mergedLower),) + word[ntIdx + 2:]
 			elif mergePrev:
 				# merge only with previous segment
 				mergedUpper = word[ntIdx - 1][0] + ruleRhs[0][0]
 				mergedLower = word[ntIdx - 1][1] + ruleRhs[0][1]
-				retval = word[:ntIdx - 1] + [(mergedUpper, mergedLower)] + word[ntIdx + 1:]
+				retval = word[:ntIdx - 1] + ((mergedUpper, mergedLower),) + word[ntIdx + 1:]
 			elif mergeNext:
 				# merge with followinf segment
 				mergedUpper = ruleRhs[0][0] + word[ntIdx + 1][0]
 				mergedLower = ruleRhs[0][1] + word[ntIdx + 1][1]
-				retval = word[:ntIdx] + [(mergedUpper, mergedLower)] + word[ntIdx + 2:]
+				retval = word[:ntIdx] + ((mergedUpper, mergedLower),) + word[ntIdx + 2:]
 			else:
 				# nothing to merge, just replace the non-term
-				retval = word[:ntIdx] + [ruleRhs[0]] + word[ntIdx + 1:]
+				retval = word[:ntIdx] + ruleRhs + word[ntIdx + 1:]
 		else:
 			# there is a terminal segment as the first letter of rule rhs
 			mergePrev = mergePrev and is_term(ruleRhs[0])
@@ -493,43 +988,44 @@ class cWK_CFG:
 				mergedLowerPrev = word[ntIdx - 1][1] + ruleRhs[0][1]
 				mergedUpperNext = ruleRhs[-1][0] + word[ntIdx + 1][0]
 				mergedLowerNext = ruleRhs[-1][1] + word[ntIdx + 1][1]
-				retval = word[:ntIdx - 1] + [(mergedUpperPrev, mergedLowerPrev)] + ruleRhs[1:-1] + [(mergedUpperNext, mergedLowerNext)] + word[ntIdx + 2:]
+				retval = word[:ntIdx - 1] + ((mergedUpperPrev, mergedLowerPrev),) + ruleRhs[1:-1] + ((mergedUpperNext, mergedLowerNext),) + word[ntIdx + 2:]
 			elif mergePrev:
 				# merge only with previous segment
 				mergedUpperPrev = word[ntIdx - 1][0] + ruleRhs[0][0]
 				mergedLowerPrev = word[ntIdx - 1][1] + ruleRhs[0][1]
-				retval = word[:ntIdx - 1] + [(mergedUpperPrev, mergedLowerPrev)] + ruleRhs[1:] + word[ntIdx + 1:]
+				retval = word[:ntIdx - 1] + ((mergedUpperPrev, mergedLowerPrev),) + ruleRhs[1:] + word[ntIdx + 1:]
 			elif mergeNext:
 				# merge only with following segment
 				mergedUpperNext = ruleRhs[-1][0] + word[ntIdx + 1][0]
 				mergedLowerNext = ruleRhs[-1][1] + word[ntIdx + 1][1]
-				retval = word[:ntIdx] + ruleRhs[:-1] + [(mergedUpperNext, mergedLowerNext)] + word[ntIdx + 2:]
+				retval = word[:ntIdx] + ruleRhs[:-1] + ((mergedUpperNext, mergedLowerNext),) + word[ntIdx + 2:]
 			else:
 				# nothing to merge, just replace the non-term
 				retval = word[:ntIdx] + ruleRhs + word[ntIdx + 1:]
 
-		debug(f'result: {wordToStr(retval)}')
+		debug(f'result: {wordToStr(self.expand_word(retval))}')
 		return retval
 
 
 	# is a word a solution?
-	def is_result(self, word: tWord, goal: str) -> bool:
+	def is_result(self, node: cTreeNode, goal: str) -> bool:
 
-		# word lenght must be of len 1 and it must be terminal segment
-		if len(word) != 1 or is_nonterm(word[0]):
+		# word must consist of the terminal head only
+		if node.tail is not None:
 			return False
 
 		# the len of both strands must be the same as the input length
-		if len(word[0][0]) != len(word[0][1]) or len(word[0][0]) != len(goal) :
+		upper, lower = node.head
+		if len(upper) != len(lower) or len(upper) != len(goal) :
 			return False
 
 		# the complementarity relation must hold
-		for symbol1, symbol2 in zip(word[0][0], word[0][1]):
+		for symbol1, symbol2 in zip(upper, lower):
 			if (symbol1, symbol2) not in self.relation:
 				return False
 
 		# the upper strand must be equal to the input
-		if ''.join(word[0][0]) != goal:
+		if upper != goal:
 			return False
 
 		return True
@@ -539,11 +1035,18 @@ class cWK_CFG:
 	def printPath(self, node: cTreeNode) -> None:
 		currentNode: Optional[cTreeNode] = node
 		while currentNode:
-			debug(f' >>> {wordToStr(currentNode.word)}')
+			debug(f' >>> {wordToStr(self.expand_word(currentNode.word))}')
 			currentNode = currentNode.parent
 
 ################# pruning functions                  #######################################################
 
+	# index of the input - the one of the current search, a new one if called for a different input
+	def get_goal_index(self, goalStr: str) -> cGoalIndex:
+		if self.goalIndex is None or self.goalIndex.goal != goalStr:
+			self.goalIndex = cGoalIndex(goalStr)
+		return self.goalIndex
+
+
 	# activate/deactivate heuristics
 	def activate(self, name: str, value: bool=True) -> None:
 		if name == 'SL':
@@ -558,7 +1061,13 @@ class cWK_CFG:
 			self.pruningOptions[self.prune_check_regex] = value
 		else:
 			nodePrecNames = list(map(lambda x: x[0], self.nodePrecedenceList))
-			if name not in nodePrecNames:
+			frontierNames = list(map(lambda x: x[0], self.frontierList))
+			if name in frontierNames:
+				if value:
+					self.currentFrontier = frontierNames.index(name)
+				else:
+					print(f'cannot deactivate open list, activate a different one')
+			elif name not in nodePrecNames:
 				print(f'unknown heuristic: "{name}"')
 			elif value:
 				self.currentNodePrecedence = nodePrecNames.index(name)
@@ -578,234 +1087,399 @@ class cWK_CFG:
 
 	# WS - does the first letter (if it's term segment) correspond to the input start?
 	def prune_check_word_start(self, node: cTreeNode, goalStr: str) -> bool:
-		return is_nonterm(node.word[0]) or goalStr.startswith(''.join(node.word[0][0]))
+		return self.get_goal_index(goalStr).occurs_at(node.head[0], 0)
+
+
+	# WS incrementally - only the part appended to the head of the parent is checked
+	def prune_check_word_start_incremental(self, node: cTreeNode, goalStr: str) -> bool:
+		headLen = len(node.parent.head[0])
+		return self.get_goal_index(goalStr).occurs_at(node.head[0][headLen:], headLen)
 
 
 	# RL - is the complementary relation met?
 	def prune_check_relation(self, node: cTreeNode, goalStr: str) -> bool:
-		if is_nonterm(node.word[0]):
-			return True
-		shorterStrand = min(len(node.word[0][0]), len(node.word[0][1]))
-		for idx in range(shorterStrand):
-			if (node.word[0][0][idx], node.word[0][1][idx]) not in self.relation:
+		for pair in zip(node.head[0], node.head[1]):
+			if pair not in self.relation:
+				return False
+		return True
+
+
+	# RL incrementally - only the pairs the parent didn't have are checked
+	def prune_check_relation_incremental(self, node: cTreeNode, goalStr: str) -> bool:
+		pairsLen = min(len(node.parent.head[0]), len(node.parent.head[1]))
+		for pair in zip(node.head[0][pairsLen:], node.head[1][pairsLen:]):
+			if pair not in self.relation:
 				return False
 		return True
 
 
 	# make word into regex
-	# helper function only called from prune_check_regex
-	def _word_to_regex(self, word: tWord) -> str:
+	# not used by the search anymore, kept as the reference for the RE matcher (see tests)
+	def _word_to_regex(self, node: cTreeNode) -> str:
 
-		# starting nonterm is repesented by omitting ^
-		regex = '^' if is_term(word[0]) else ''
+		# the head (even empty one) anchors the start
+		regex = '^' + node.head[0]
+		prevTerm = True
 
-		for idx, letter in enumerate(word):
-			if is_nonterm(letter) and idx > 0 and is_term(word[idx-1]):
+		cell = node.tail
+		while cell is not None:
+			if is_nonterm(cell.letter) and prevTerm:
 				# nonterm can generate in general anything - use wildcard
 				regex += '.*'
-			elif is_term(letter):
+			elif is_term(cell.letter):
 				# term from the upper strand stand for themselves
-				regex += ''.join(letter[0])
+				regex += cell.letter[0]
+			prevTerm = is_term(cell.letter)
+			cell = cell.next
 
-		if is_term(word[-1]):
+		if prevTerm:
 			# ending nonterm is repesented by omitting $
 			regex += '$'
 
 		return regex
 
 
+	# split word into the fixed pieces of its regex - upper strands between nonterms (the '.*' wildcards)
+	# the first piece (the head) is anchored to the start, the last one to the end if the word ends with a term
+	# helper function only called from prune_check_regex
+	def _word_to_pieces(self, node: cTreeNode) -> Tuple[Tuple[str, ...], bool]:
+		pieces = [node.head[0]]
+		prevTerm = True
+
+		cell = node.tail
+		while cell is not None:
+			if is_nonterm(cell.letter) and prevTerm:
+				# nonterm can generate in general anything - start a new piece
+				pieces.append('')
+			elif is_term(cell.letter):
+				pieces[-1] += cell.letter[0]
+			prevTerm = is_term(cell.letter)
+			cell = cell.next
+
+		return tuple(pieces), prevTerm
+
+
+	# does the input match the pieces separated by wildcards?
+	# the same as searching the regex, but without compiling it
+	def _match_pieces(self, pieces: Tuple[str, ...], endAnchored: bool, goalStr: str) -> bool:
+		goalIndex = self.get_goal_index(goalStr)
+		if not goalIndex.occurs_at(pieces[0], 0):
+			return False
+		if len(pieces) == 1:
+			return not endAnchored or len(pieces[0]) == len(goalStr)
+
+		# the leftmost occurrence of each piece leaves the most space for the following ones
+		goalIdx = len(pieces[0])
+		for piece in pieces[1:-1]:
+			goalIdx = goalIndex.find(piece, goalIdx)
+			if goalIdx < 0:
+				return False
+			goalIdx += len(piece)
+
+		if endAnchored:
+			return len(goalStr) - len(pieces[-1]) >= goalIdx and goalIndex.is_suffix(pieces[-1])
+		return goalIndex.find(pieces[-1], goalIdx) >= 0
+
+
 	# RE - does the input correspond to the regex made from word?
 	def prune_check_regex(self, node: cTreeNode, goalStr: str) -> bool:
-		regex = self._word_to_regex(node.word)
-		return re.compile(regex).search(goalStr) is not None
+		pieces, endAnchored = self._word_to_pieces(node)
+		shape = (goalStr, pieces, endAnchored)
+		result = self.regexCache.get(shape)
+		if result is None:
+			if len(self.regexCache) >= CACHE_SIZE:
+				self.regexCache.clear()
+			result = self.regexCache[shape] = self._match_pieces(pieces, endAnchored, goalStr)
+		return result
+
+
+	# rightmost input idx the word from the cell on can start to match the regex at (-1 if it can't match)
+	# the values are cached in the cells (shared with the parent), only the newly created cells are computed
+	# helper function only called from prune_check_regex_incremental
+	def _regex_start(self, cell: cWordCell, goalStr: str) -> int:
+		goalIndex = self.get_goal_index(goalStr)
+		newCells = []
+		while cell is not None and cell.reGoal is not goalStr:
+			newCells.append(cell)
+			cell = cell.next
+
+		# from the right, each cell needs the value of the following ones
+		for cell in reversed(newCells):
+			if is_nonterm(cell.letter):
+				# wildcard - can start anywhere before the rest of the word
+				cell.reStart = cell.next.reStart if cell.next is not None else len(goalStr)
+			else:
+				# term segments are matched together up to the next nonterm
+				upper, following = cell.letter[0], cell.next
+				while following is not None and is_term(following.letter):
+					upper += following.letter[0]
+					following = following.next
+				if following is None:
+					# the segment must match the input end
+					cell.reStart = len(goalStr) - len(upper) if goalIndex.is_suffix(upper) else -1
+				elif following.reStart < 0:
+					cell.reStart = -1
+				else:
+					cell.reStart = goalIndex.rfind(upper, following.reStart)
+			cell.reGoal = goalStr
+
+		return newCells[0].reStart if newCells else cell.reStart
+
+
+	# RE incrementally - the head must be the input start (its new part is checked)
+	# and the tail must be able to match somewhere behind it
+	def prune_check_regex_incremental(self, node: cTreeNode, goalStr: str) -> bool:
+		if not self.prune_check_word_start_incremental(node, goalStr):
+			return False
+		if node.tail is None:
+			return len(node.head[0]) == len(goalStr)
+		if is_term(node.tail.letter):
+			# tail not starting with a nonterm isn't created by the search
+			return self.prune_check_regex(node, goalStr)
+		return len(node.head[0]) <= self._regex_start(node.tail, goalStr)
 
 ################# node precedence functons           #######################################################
 
+	# the heuristics don't rescan the word - each node caches a state (precState) derived from the parent's
+	# state and the applied rule, only the root (a node without parent) is evaluated from scratch
+
 	# just call the right precedence method based on currentNodePrecedence
-	def compute_precedence(self, word: tWord, goalStr: str) -> int:
-		return self.nodePrecedenceList[self.currentNodePrecedence][1](word, goalStr)
+	def compute_precedence(self, node: cTreeNode, goalStr: str) -> int:
+		return self.nodePrecedenceList[self.currentNodePrecedence][1](node, goalStr)
+
+
+	# how many symbols of s match the goal from the offset on
+	def _match_len(self, s: str, goal: str, offset: int) -> int:
+		return self.get_goal_index(goal).match_len(s, offset)
+
+
+	# count of symbols of s equal to the goal symbol at the same position
+	def _match_cnt(self, s: str, goal: str, offset: int) -> int:
+		return self.get_goal_index(goal).match_cnt(s, offset)
+
+
+	# state of the word from the cell on matched from goalIdx, cached in the cell - when a rule emits upper strand
+	# terms, the rest of the word (shared with the parent) is shifted against the input, the siblings and
+	# descendants that share the cells and shift them by the same count then take the state from the cache
+	# helper function - returns the cached state (None if not cached) and the states of the cell for the input
+	def _tm_cached(self, cell: cWordCell, heuristic: int, goalIdx: int, goal: str) -> Tuple[Any, Dict[Tuple[int, int], Any]]:
+		if cell.tmGoal is not goal:
+			cell.tmGoal, cell.tmStates = goal, {}
+		return cell.tmStates.get((heuristic, goalIdx)), cell.tmStates
+
+
+	# TM1 state of the word from the cell on - (input idx after the upper strand terms matching from goalIdx,
+	# nonterms before the first mismatch, their distances, was there a mismatch)
+	def _tm1_cell(self, cell: Optional[cWordCell], goalIdx: int, goal: str) -> Tuple[int, int, int, bool]:
+		path = []
+		state: Optional[Tuple[int, int, int, bool]] = None
+		# once there are no more upper strand terms, nothing can mismatch
+		while cell is not None and cell.upperCnt > 0:
+			state, states = self._tm_cached(cell, 1, goalIdx, goal)
+			if state is not None:
+				break
+			path.append((cell, goalIdx, states))
+			if is_term(cell.letter):
+				matched = self._match_len(cell.letter[0], goal, goalIdx)
+				if matched < len(cell.letter[0]):
+					state = (goalIdx + matched, 0, 0, True)
+					break
+				goalIdx += matched
+			cell = cell.next
+		if state is None:
+			state = (goalIdx, 0, 0, False)
+
+		# from the right, each cell adds itself to the state of the following ones
+		for cell, goalIdx, states in reversed(path):
+			if is_nonterm(cell.letter):
+				state = (state[0], state[1] + 1, state[2] + self.ntIdDistances[cell.letter], state[3])
+			states[(1, goalIdx)] = state
+		return state
+
+
+	# TM1 state - (upper strand terms matching the input start, nonterms before the first mismatch, their distances)
+	# helper function - continues from goalIdx at the given cell
+	def _tm1_walk(self, cell: Optional[cWordCell], goalIdx: int, ntCnt: int, ntDist: int, node: cTreeNode, goal: str) -> Tuple[int, int, int]:
+		goalIdx, cellNtCnt, cellNtDist, mismatch = self._tm1_cell(cell, goalIdx, goal)
+		if mismatch:
+			return goalIdx, ntCnt + cellNtCnt, ntDist + cellNtDist
+		return goalIdx, node.ntCnt, node.ntDist
+
+
+	def _tm1_state(self, node: cTreeNode, goal: str) -> Tuple[int, int, int]:
+		parent, rule = node.parent, node.rule
+		if parent is None or rule is None:
+			# no parent - scan the word
+			matched = self._match_len(node.head[0], goal, 0)
+			if matched < len(node.head[0]):
+				node.precState = (matched, 0, 0)
+			else:
+				node.precState = self._tm1_walk(node.tail, matched, 0, 0, node, goal)
+			return node.precState
+
+		goalIdx, ntCnt, ntDist = parent.precState
+		headLen = len(parent.head[0])
+		if goalIdx < headLen:
+			# mismatch in the head, which the node shares with the parent
+			node.precState = parent.precState
+			return node.precState
+
+		# the rewritten nonterm followed the head - match the upper strand of the rule
+		matched = self._match_len(rule.upper, goal, headLen)
+		if matched < len(rule.upper):
+			# mismatch within the rule, count the nonterms of the rule before it
+			ntCnt, ntDist, upperIdx = 0, 0, 0
+			for letter in rule.rhs:
+				if is_nonterm(letter):
+					ntCnt += 1
+					ntDist += self.ntIdDistances[letter]
+				elif upperIdx + len(letter[0]) > matched:
+					break
+				else:
+					upperIdx += len(letter[0])
+			node.precState = (headLen + matched, ntCnt, ntDist)
+		elif len(rule.upper) == 0:
+			# the rest of the word is not shifted - the mismatch stays where it was for the parent
+			node.precState = (goalIdx, ntCnt - 1 + rule.ntCnt, ntDist + rule.distDelta)
+		else:
+			# the rest of the word is shifted against the input
+			node.precState = self._tm1_walk(parent.tail.next, headLen + matched, rule.ntCnt, rule.ntDist, node, goal)
+		return node.precState
+
+
+	# upper strand terms of the word from the cell on equal to the input symbol at the same idx, starting at goalIdx
+	def _tm2_cell(self, cell: Optional[cWordCell], goalIdx: int, goal: str) -> int:
+		path = []
+		total: Optional[int] = None
+		while cell is not None and cell.upperCnt > 0:
+			total, states = self._tm_cached(cell, 2, goalIdx, goal)
+			if total is not None:
+				break
+			if is_term(cell.letter):
+				path.append((goalIdx, self._match_cnt(cell.letter[0], goal, goalIdx), states))
+				goalIdx += len(cell.letter[0])
+			else:
+				path.append((goalIdx, 0, states))
+			cell = cell.next
+		if total is None:
+			total = 0
+
+		for goalIdx, matched, states in reversed(path):
+			total += matched
+			states[(2, goalIdx)] = total
+		return total
+
+
+	# TM2 state - (upper strand terms of the head equal to the input symbol at the same idx, the same for the whole word)
+	def _tm2_state(self, node: cTreeNode, goal: str) -> Tuple[int, int]:
+		parent, rule = node.parent, node.rule
+		if parent is None or rule is None:
+			# no parent - scan the word
+			headCnt = self._match_cnt(node.head[0], goal, 0)
+			node.precState = (headCnt, headCnt + self._tm2_cell(node.tail, len(node.head[0]), goal))
+			return node.precState
+
+		parentHeadCnt, parentTotal = parent.precState
+		headLen = len(parent.head[0])
+		headCnt = parentHeadCnt + self._match_cnt(node.head[0][headLen:], goal, headLen)
+		total = parentHeadCnt + self._match_cnt(rule.upper, goal, headLen)
+
+		if len(rule.upper) == 0:
+			# the rest of the word is not shifted against the input
+			total += parentTotal - parentHeadCnt
+		else:
+			# the rest of the word is shifted against the input
+			total += self._tm2_cell(parent.tail.next, headLen + len(rule.upper), goal)
+
+		node.precState = (headCnt, total)
+		return node.precState
+
+
+	# TM3 state - upper strand terms of the head matching the input start
+	def _tm3_state(self, node: cTreeNode, goal: str) -> int:
+		parent = node.parent
+		if parent is None:
+			node.precState = self._match_len(node.head[0], goal, 0)
+		elif parent.precState < len(parent.head[0]):
+			# mismatch in the part of the head shared with the parent
+			node.precState = parent.precState
+		else:
+			# continue with what was appended to the head
+			headLen = len(parent.head[0])
+			node.precState = headLen + self._match_len(node.head[0][headLen:], goal, headLen)
+		return node.precState
 
 
 	# no heurictic - return 0
-	def compute_precedence_no_heuristic(self, word: tWord, goal: str) -> int:
+	def compute_precedence_no_heuristic(self, node: cTreeNode, goal: str) -> int:
 		return 0
 
 
 	# return number of nonterms
-	def compute_precedence_NTA(self, word: tWord, goal: str) -> int:
-		evaluation = 0
-		for letter in word:
-			if is_nonterm(letter):
-				evaluation += 1
-		return evaluation
+	def compute_precedence_NTA(self, node: cTreeNode, goal: str) -> int:
+		return node.ntCnt
 
 
 	# return sum of distances of all nonterms
-	def compute_precedence_WNTA(self, word: tWord, goal: str) -> int:
-		evaluation = 0
-		for letter in word:
-			if is_nonterm(letter):
-				evaluation += self.ntDistances[letter]
-		return evaluation
+	def compute_precedence_WNTA(self, node: cTreeNode, goal: str) -> int:
+		return node.ntDist
 
 
 	# look only at terminals with some upper strands
 	# if symbol in upper strand match goal -> priority increases
 	# once you find one that doesn't, finish
-	def compute_precedence_TM1(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_term(letter):
-				for symbol in letter[0]:
-					if len(goal) > goalIdx and symbol == goal[goalIdx]:
-						evaluation -= 1
-						goalIdx += 1
-					else:
-						return evaluation
-		return evaluation
+	def compute_precedence_TM1(self, node: cTreeNode, goal: str) -> int:
+		matched, _, _ = self._tm1_state(node, goal)
+		return -matched
 
 
 	# look at terminals with some upper strands only
 	# if symbol in upper strand match goal -> priority increases
 	# but unlike previous case, if you find one that doesn't match input, just descrease priority and continue
-	def compute_precedence_TM2(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_term(letter):
-				for symbol in letter[0]:
-					if len(goal) > goalIdx and symbol == goal[goalIdx]:
-						evaluation -= 1
-					else:
-						evaluation += 1
-					goalIdx += 1
-		return evaluation
+	def compute_precedence_TM2(self, node: cTreeNode, goal: str) -> int:
+		_, matched = self._tm2_state(node, goal)
+		return node.upperStrLen - 2 * matched
 
 
 	# look at first letter
 	# if it is terminal and has upper strand - check how it matches goal - increase priority
 	# else do nothing
-	def compute_precedence_TM3(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		if len(word) > 0 and is_term(word[0]):
-			for symbol in word[0][0]:
-				if len(goal) > goalIdx and symbol == goal[goalIdx]:
-					evaluation -= 1
-					goalIdx += 1
-				else:
-					return evaluation
-		return evaluation
+	def compute_precedence_TM3(self, node: cTreeNode, goal: str) -> int:
+		return -self._tm3_state(node, goal)
 
 
-	# NTA + TM1 combination
-	def compute_precedence_NTA_TM1(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_term(letter):
-				for symbol in letter[0]:
-					if len(goal) > goalIdx and symbol == goal[goalIdx]:
-						evaluation -= 10
-						goalIdx += 1
-					else:
-						return evaluation
-
-			else:
-				evaluation += 1
-		return evaluation
+	# NTA + TM1 combination - only nonterms before the first mismatch count
+	def compute_precedence_NTA_TM1(self, node: cTreeNode, goal: str) -> int:
+		matched, ntCnt, _ = self._tm1_state(node, goal)
+		return ntCnt - 10 * matched
 
 
 	# NTA + TM2 combination
-	def compute_precedence_NTA_TM2(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_term(letter):
-				for symbol in letter[0]:
-					if len(goal) > goalIdx and symbol == goal[goalIdx]:
-						evaluation -= 10
-						goalIdx += 1
-					else:
-						evaluation += 10
-						goalIdx += 1
-
-			else:
-				evaluation += 1
-		return evaluation
+	def compute_precedence_NTA_TM2(self, node: cTreeNode, goal: str) -> int:
+		_, matched = self._tm2_state(node, goal)
+		return node.ntCnt + 10 * (node.upperStrLen - 2 * matched)
 
 
 	# NTA + TM3 combination
-	def compute_precedence_NTA_TM3(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_nonterm(letter):
-				evaluation += 1
-
-		if len(word) > 0 and is_term(word[0]):
-			for symbol in word[0][0]:
-				if len(goal) > goalIdx and symbol == goal[goalIdx]:
-					evaluation -= 10
-					goalIdx += 1
-				else:
-					return evaluation
-		return evaluation
-
+	def compute_precedence_NTA_TM3(self, node: cTreeNode, goal: str) -> int:
+		return node.ntCnt - 10 * self._tm3_state(node, goal)
 
-	# WNTA + TM1 combination
-	def compute_precedence_WNTA_TM1(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_term(letter):
-				for symbol in letter[0]:
-					if len(goal) > goalIdx and symbol == goal[goalIdx]:
-						evaluation -= 10
-						goalIdx += 1
-					else:
-						return evaluation
 
-			else:
-				evaluation += self.ntDistances[letter]
-		return evaluation
+	# WNTA + TM1 combination - only nonterms before the first mismatch count
+	def compute_precedence_WNTA_TM1(self, node: cTreeNode, goal: str) -> int:
+		matched, _, ntDist = self._tm1_state(node, goal)
+		return ntDist - 10 * matched
 
 
 	# WNTA + TM2 combination
-	def compute_precedence_WNTA_TM2(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_term(letter):
-				for symbol in letter[0]:
-					if len(goal) > goalIdx and symbol == goal[goalIdx]:
-						evaluation -= 10
-					else:
-						evaluation += 10
-					goalIdx += 1
-
-			else:
-				evaluation += self.ntDistances[letter]
-		return evaluation
+	def compute_precedence_WNTA_TM2(self, node: cTreeNode, goal: str) -> int:
+		_, matched = self._tm2_state(node, goal)
+		return node.ntDist + 10 * (node.upperStrLen - 2 * matched)
 
 
 	# WNTA + TM3 combination
-	def compute_precedence_WNTA_TM3(self, word: tWord, goal: str) -> int:
-		goalIdx, evaluation = 0, 0
-
-		for letter in word:
-			if is_nonterm(letter):
-				evaluation += self.ntDistances[letter]
-
-		if len(word) > 0 and is_term(word[0]):
-			for symbol in word[0][0]:
-				if len(goal) > goalIdx and symbol == goal[goalIdx]:
-					evaluation -= 10
-					goalIdx += 1
-				else:
-					return evaluation
-		return evaluation
+	def compute_precedence_WNTA_TM3(self, node: cTreeNode, goal: str) -> int:
+		return node.ntDist - 10 * self._tm3_state(node, goal)
 
 ################# transformation to CBF              #######################################################
 
@@ -818,8 +1492,36 @@ class cWK_CFG:
 		return prefix + str(self.lastCreatedNonTerm)
 
 
+	# break down the right sides with more than two erasable nonterms into rules with two letters
+	# (A -> X1 X2 ... Xn becomes A -> X1 N1, N1 -> X2 N2, ..., Nn-2 -> Xn-1 Xn) and find the erasable nonterms again
+	# helper function - only called from remove_lambda_rules
+	def _binarize_erasable_rules(self) -> None:
+		self.nts = set(self.nts)    # new nonterms are added to a new set, the old one can be in a snapshot
+		newRules: Set[cRule] = set()
+		for rule in self.rules:
+			if sum(1 for letter in rule.rhs if is_nonterm(letter) and letter in self.erasableNts) <= 2:
+				newRules.add(rule)
+				continue
+
+			currentNt = rule.lhs
+			for letter in rule.rhs[:-2]:
+				newNt = self.createNewNt()
+				self.nts.add(newNt)
+				newRules.add(cRule(currentNt, [letter, newNt]))
+				currentNt = newNt
+			newRules.add(cRule(currentNt, rule.rhs[-2:]))
+
+		self.rules = newRules
+		self.find_erasable_nts()
+
+
 	# remove lambda rules (A -> lambda/lamda)
-	def remove_lambda_rules(self) -> None:
+	# each rule gives a rule for every combination of its erasable nonterms (2^k rules for k of them),
+	# with binarize the long right sides are broken down first, so that it is at most 4 rules for each
+	# returns the count of the rules
+	def remove_lambda_rules(self, precalculate: bool = True, binarize: bool = False) -> int:
+		if binarize:
+			self._binarize_erasable_rules()
 		newRules: Set[cRule] = set()
 
 		for rule in self.rules:
@@ -838,70 +1540,113 @@ class cWK_CFG:
 				for idx, letter in enumerate(rule.rhs):
 					# compose the rule rhs - add erasable nonterms according to the current combination
 					if idx not in erasableIdxs or idx in idxLst:
-						newRuleRhs.append(deepcopy(letter))
+						newRuleRhs.append(letter)
 
 				newRule = cRule(rule.lhs, newRuleRhs)
 				# make sure the rule isn't empty (we removing those and is unique)
-				if newRule.rhs != [([], [])] and newRule.rhs != [] and newRule not in newRules:
+				if newRule.rhs != (((), ()),) and newRule.rhs != () and newRule not in newRules:
 					newRules.add(newRule)
 
 		self.rules = newRules
-		self.precalculate_data()
+		if precalculate:
+			self.precalculate_data()
+		debug(f'lambda rules removed: {len(self.rules)} rules')
+		return len(self.rules)
+
+
+	# which nonterms every nonterm generates by unit rules (itself included) - bitsets over ntNames
+	# the graph of the unit rules is condensed to its strongly connected components (Tarjan's algorithm,
+	# iterative), the components are finished successors first, so the closure of a component is its
+	# nonterms and the closures of its successors
+	# helper function - only called from remove_unit_rules
+	def _unit_rule_closure(self, ntNames: List[tNonTerm]) -> List[int]:
+		ntIds = {nt: idx for idx, nt in enumerate(ntNames)}
+		successors: List[Set[int]] = [set() for _ in ntNames]
+		for rule in self.rules:
+			if len(rule.rhs) == 1 and is_nonterm(rule.rhs[0]):
+				successors[ntIds[rule.lhs]].add(ntIds[rule.rhs[0]])
+
+		closures: List[int] = [0] * len(ntNames)
+		order: List[int] = [-1] * len(ntNames)    # -1 not visited yet
+		lowLinks: List[int] = [0] * len(ntNames)
+		onStack: List[bool] = [False] * len(ntNames)
+		stack: List[int] = []
+		visited = 0
+
+		for root in range(len(ntNames)):
+			if order[root] != -1:
+				continue
+			order[root] = lowLinks[root] = visited
+			visited += 1
+			stack.append(root)
+			onStack[root] = True
+			path = [(root, iter(successors[root]))]
+			while path:
+				v, nexts = path[-1]
+				for w in nexts:
+					if order[w] == -1:
+						order[w] = lowLinks[w] = visited
+						visited += 1
+						stack.append(w)
+						onStack[w] = True
+						path.append((w, iter(successors[w])))
+						break
+					if onStack[w]:
+						lowLinks[v] = min(lowLinks[v], order[w])
+				else:
+					path.pop()
+					if path:
+						lowLinks[path[-1][0]] = min(lowLinks[path[-1][0]], lowLinks[v])
+					if lowLinks[v] == order[v]:
+						# v is the root of a component - pop it, the successors outside are finished
+						members: List[int] = []
+						while True:
+							w = stack.pop()
+							onStack[w] = False
+							members.append(w)
+							if w == v:
+								break
+						closure = 0
+						for w in members:
+							closure |= 1 << w
+						for w in members:
+							for x in successors[w]:
+								closure |= closures[x]
+						for w in members:
+							closures[w] = closure
+		return closures
 
 
 	# remove unit rules (A -> B)
-	def remove_unit_rules(self) -> None:
-
-		# dictionary - which nonterm can generate key nonterm
-		simpleRules: Dict[tNonTerm, List[tNonTerm]] = {}
-
-		# init - every nonterm can generate itself (in 0 steps)
-		for nt in self.nts:
-			simpleRules[nt] = [nt]
+	def remove_unit_rules(self, precalculate: bool = True) -> None:
+		ntNames = sorted(self.nts)
+		closures = self._unit_rule_closure(ntNames)
 
-		# loop until no change occure
-		loop = True
-		while loop:
-			loop = False
-			for rule in self.rules:
-				if len(rule.rhs) == 1 and is_nonterm(rule.rhs[0]) and rule.lhs != rule.rhs:
-					# find all non terminals which have lhs in their N but no rhs
-					for k, v in simpleRules.items():
-						if rule.lhs in v and rule.rhs[0] not in v:
-							# a new simple rule found - keep looping
-							simpleRules[k].append(rule.rhs[0])
-							loop = True
-
-		newRules: Set[cRule] = set()
+		# the rules that are not simple, by the left side
+		rulesByLhs: Dict[tNonTerm, List[cRule]] = {}
 		for rule in self.rules:
-			# if this is not a simple rule...
 			if len(rule.rhs) != 1 or is_term(rule.rhs[0]):
-				# ...create rules replacing the lhs with nonterms that can generate this one
-				for k, v in simpleRules.items():
-					if rule.lhs in v:
-						newRules.add(cRule(k, deepcopy(rule.rhs)))
+				rulesByLhs.setdefault(rule.lhs, []).append(rule)
+
+		newRules: Set[cRule] = set()
+		for nt, closure in zip(ntNames, closures):
+			# create rules replacing the lhs with nonterms that can generate this one
+			while closure:
+				bit = closure & -closure
+				closure ^= bit
+				for rule in rulesByLhs.get(ntNames[bit.bit_length() - 1], []):
+					newRules.add(cRule(nt, rule.rhs))
 
 		self.rules = newRules
-		self.precalculate_data()
+		if precalculate:
+			self.precalculate_data()
 
 
 	# if a symbol cannot generate terminal string, it can never be used on a successful run
 	# it can be erased (and rules using it)
-	def remove_unterminatable_symbols(self) -> None:
-		terminatableNts: Set[tNonTerm] = set()
-
-		# keep looping until no change occures
-		loop = True
-		while loop:
-			loop = False
-			for rule in self.rules:
-				# terminatable symbol generates only terms, or other terminatable symbols
-				if len(list(filter(lambda letter: is_nonterm(letter) and letter not in terminatableNts, rule.rhs))) == 0:
-					if rule.lhs not in terminatableNts:
-						terminatableNts.add(rule.lhs)
-						# found something - keep looping
-						loop = True
-
+	def remove_unterminatable_symbols(self, precalculate: bool = True) -> None:
+		# terminatable symbol generates only terms, or other terminatable symbols
+		terminatableNts: Set[tNonTerm] = set(self._rule_fixpoint(lambda rule: 0))
 
 		# check all rules and remove those that use unterminatable symbols
 		newRules: Set[cRule] = set()
@@ -912,35 +1657,33 @@ class cWK_CFG:
 		# keep only nonterms that are terminatable
 		self.nts = self.nts.intersection(terminatableNts)
 		self.rules = newRules
-		self.precalculate_data()
+		if precalculate:
+			self.precalculate_data()
 
 
 	# if a symbol cannot be generated from the starting symbol, it is useless
 	# it can be erased (and rules using it)
-	def remove_unreachable_symbols(self) -> None:
+	def remove_unreachable_symbols(self, precalculate: bool = True) -> None:
 		# both nts and ts can be unreachable, starting symbol is reachable trivially
-		reachableNts: Set[tNonTerm] = set(self.startSymbol)
+		reachableNts: Set[tNonTerm] = {self.startSymbol}
 		reachableTs: Set[tTerm] = set()
 
-		# keep looping until there is no change, find all reachable symbols
-		loop = True
-		while loop:
-			loop = False
-			# follow all rules, see what you can find
-			for rule in self.rules:
-				if rule.lhs in reachableNts:
-					for letter in rule.rhs:
-						if is_nonterm(letter):
-							if letter not in reachableNts:
-								# new reachable nonterm found, keep looping
-								reachableNts.add(letter)
-								loop = True
-						else:
-							for terminal in letter[0] + letter[1]:
-								if terminal not in reachableTs:
-									# new reachable term found, keep looping
-									reachableTs.add(terminal)
-									loop = True
+		rulesByLhs: Dict[tNonTerm, List[cRule]] = {}
+		for rule in self.rules:
+			rulesByLhs.setdefault(rule.lhs, []).append(rule)
+
+		# follow the rules of every newly reached nonterm, see what you can find
+		worklist = [self.startSymbol]
+		while worklist:
+			for rule in rulesByLhs.get(worklist.pop(), []):
+				for letter in rule.rhs:
+					if is_nonterm(letter):
+						if letter not in reachableNts:
+							# new reachable nonterm found, its rules will be followed
+							reachableNts.add(letter)
+							worklist.append(letter)
+					else:
+						reachableTs.update(letter[0], letter[1])
 
 		# check all rules and remove those that use unreachable symbols
 		newRules: Set[cRule] = set()
@@ -953,88 +1696,95 @@ class cWK_CFG:
 		self.ts = self.ts.intersection(reachableTs)
 		self.rules = newRules
 
-		self.precalculate_data()
+		if precalculate:
+			self.precalculate_data()
 
 
 	# splits a segment - creates a new one with 1 symbol
 	# helper function use only in dismantle_term_letters
-	def _pop_term_from_letter(self, letter: tTermLetter) -> tTermLetter:
+	# returns the segment with the symbol and the rest of the letter
+	def _pop_term_from_letter(self, letter: tTermLetter) -> Tuple[tTermLetter, tTermLetter]:
 		if len(letter[0]) > len(letter[1]):
-			t = letter[0].pop(0)
-			return ([t], [])
+			return ((letter[0][0],), ()), (letter[0][1:], letter[1])
 		else:
-			t = letter[1].pop(0)
-			return ([], [t])
+			return ((), (letter[1][0],)), (letter[0], letter[1][1:])
 
 
 	# each terminal in rules (that don't generate only one terminal) is replaced by non-term
 	# and new rule is generated for to place the term there
-	def dismantle_term_letters(self) -> None:
-		newRules: List[cRule] = []
+	def dismantle_term_letters(self, precalculate: bool = True) -> None:
+		self.nts = set(self.nts)    # new nonterms are added to a new set, the old one can be in a snapshot
+		newRules: Set[cRule] = set()
 
 		for rule in self.rules:
 			# rules of the form A -> a/lambda, A -> lambda/a  are ok
 			if len(rule.rhs) == 1 and is_term(rule.rhs[0]) and len(rule.rhs[0][0]) + len(rule.rhs[0][1]) == 1:
+				newRules.add(rule)
 				continue
 
 			# otherwise find terminal segments in the rhs...
-			for idx, letter in enumerate(rule.rhs):
+			rhs = list(rule.rhs)
+			for idx, letter in enumerate(rhs):
 				if is_term(letter):
 					# ...replace each term from the segment (but the last one) them with a new nonterm
 					newNt = self.createNewNt()
 					self.nts.add(newNt)
-					rule.rhs[idx] = newNt
+					rhs[idx] = newNt
 
 					# if there is only one letter - term segment - we don't want to just replace it with a nonterm
 					# we would get a unit rule, lets split the segment
-					if len(rule.rhs) == 1:
-						rule.rhs.insert(0, self._pop_term_from_letter(letter))
+					if len(rhs) == 1:
+						t, letter = self._pop_term_from_letter(letter)
+						rhs.insert(0, t)
 
 					currentNt = newNt
 					# pop terms from this segment one by one until only one is left
 					# for each one create a new rule
 					while len(letter[0]) + len(letter[1]) > 1:
-						t = self._pop_term_from_letter(letter)
+						t, letter = self._pop_term_from_letter(letter)
 						newNt = self.createNewNt()
 						self.nts.add(newNt)
-						newRules.append(cRule(currentNt, [t, newNt]))
+						newRules.add(cRule(currentNt, [t, newNt]))
 						currentNt = newNt
 
-					newRules.append(cRule(currentNt, [letter]))
-			rule.calculate_cnts()
+					newRules.add(cRule(currentNt, [letter]))
+			newRules.add(cRule(rule.lhs, rhs))
 
-		self.rules.update(newRules)
-		self.precalculate_data()
+		self.rules = newRules
+		if precalculate:
+			self.precalculate_data()
 
 
 	# does the actual breaking down of rules
 	# helper function use only in transform_to_wk_cnf_form
 	def _dismantle_rule(self, rule: cRule) -> List[cRule]:
 		newRules: List[cRule] = []
+		rhs = list(rule.rhs)
 
 		# in rules of form (A -> term B) replace the term with a new nonterm and create a rule
-		for idx, letter in enumerate(rule.rhs):
+		for idx, letter in enumerate(rhs):
 			if is_term(letter):
 				newNt = self.createNewNt()
 				newRules.append(cRule(newNt, [letter]))
-				rule.rhs[idx] = newNt
+				rhs[idx] = newNt
 				self.nts.add(newNt)
 
 		currentNt: tNonTerm = rule.lhs
 
 		# rules of form (A -> BCD...) break down the rhs with new nonterm and rules until the rhs len is 2
-		while len(rule.rhs) > 2:
+		while len(rhs) > 2:
 			newNt = self.createNewNt()
 			self.nts.add(newNt)
-			newRules.append(cRule(currentNt, [rule.rhs.pop(0), newNt]))
+			newRules.append(cRule(currentNt, [rhs.pop(0), newNt]))
 			currentNt = newNt
 
-		newRules.append(cRule(currentNt, rule.rhs))
+		newRules.append(cRule(currentNt, rhs))
 		return newRules
 
 
 	# rules of form (A -> BCD...) or form (A -> a\lambda B) (A -> lambda/a B) need to be futher broken down
-	def transform_to_wk_cnf_form(self) -> None:
+	def transform_to_wk_cnf_form(self, precalculate: bool = True) -> None:
+		self.nts = set(self.nts)    # new nonterms are added to a new set, the old one can be in a snapshot
 		newRules: Set[cRule] = set()
 
 		for rule in self.rules:
@@ -1047,95 +1797,361 @@ class cWK_CFG:
 				newRules.update(self._dismantle_rule(rule))
 
 		self.rules = newRules
-		self.precalculate_data()
+		if precalculate:
+			self.precalculate_data()
 
 
 	# transform grammar to WK-CNF
+	# the steps only need the erasable nonterms (already known), so the precalculations are done once at the end
 	def to_wk_cnf(self) -> None:
-		self.remove_lambda_rules()
-		self.remove_unit_rules()
-		self.remove_unterminatable_symbols()
-		self.remove_unreachable_symbols()
-		self.dismantle_term_letters()
-		self.transform_to_wk_cnf_form()
+		self.remove_lambda_rules(False, True)
+		self.remove_unit_rules(False)
+		self.remove_unterminatable_symbols(False)
+		self.remove_unreachable_symbols(False)
+		self.dismantle_term_letters(False)
+		self.transform_to_wk_cnf_form(False)
+		self.precalculate_data()
 
 		# possible optimization - only one non-term generates each term among the dynamically generated nonterms
 		# - could be the last step of transformation, but the impact is probably negligable
 
+
+	# the grammar in WK-CNF as a new object, this one is not changed - both forms can be used side by side
+	# the new grammar shares the (immutable) rules that need no change
+	# the transformed grammar is cached until the rules of this grammar change (they are always replaced,
+	# never changed in place), the settings of this grammar are copied to it on every call
+	def get_wk_cnf(self) -> 'cWK_CFG':
+		if self.wkCnfCache is None or self.wkCnfCache[0] is not self.rules:
+			cnf = cWK_CFG(list(self.nts), list(self.ts), self.startSymbol, list(self.rules), list(self.relation))
+			cnf.lastCreatedNonTerm = self.lastCreatedNonTerm
+			cnf.to_wk_cnf()
+			self.wkCnfCache = (self.rules, cnf)
+
+		cnf = self.wkCnfCache[1]
+		cnf.timeLimit = self.timeLimit
+		cnf.wkCykRelationCheck = self.wkCykRelationCheck
+		cnf.currentNodePrecedence = self.currentNodePrecedence
+		cnf.currentFrontier = self.currentFrontier
+		cnf.portfolio = list(self.portfolio)
+		for function, value in self.pruningOptions.items():
+			cnf.pruningOptions[getattr(cnf, function.__name__)] = value
+		# the description and input generator set by lib/grammars.py
+		for name in ('desc', 'input_gen_func'):
+			if hasattr(self, name):
+				setattr(cnf, name, getattr(self, name))
+		return cnf
+
 ################# run wk-cyk                         #######################################################
 
+	# the table X is a flat list - a cell for every pair of segments (upper strand segment, lower strand segment)
+	# segment (i, j) of a strand has the number segIds[i][j], the empty segment (0, 0) has 0,
+	# so the cells with only one strand (k = l = 0 or i = j = 0) are the first column and the first row
+	# cell (i, j, k, l) is at segIds[i][j] * segCnt + segIds[k][l]
+	# the segments are numbered by their end, so the segments of a prefix of the input keep their numbers
+	# for any longer input (see extend_wk_cyk_table)
+	# a sparse table (dictionary of the computed cells) is for the runs that only compute a few of the cells
+	def init_wk_cyk_table(self, n: int, sparse: bool = False) -> None:
+		self.segIds: List[List[int]] = [[0] * (n + 1) for _ in range(n + 1)]
+		segCnt = 1
+		for j in range(1, n + 1):
+			for i in range(1, j + 1):
+				self.segIds[i][j] = segCnt
+				segCnt += 1
+		self.segCnt = segCnt
+
+		if sparse:
+			self.X: Any = defaultdict(int)
+			self.wkCykMemoryEstimate = 0
+			return
+
+		# the list holds references to the bitsets (8 B each), the bitsets themselves are allocated for
+		# non empty cells only (ints of ~28 B + 4 B per 30 nonterms)
+		cellsCnt = segCnt * segCnt
+		self.wkCykMemoryEstimate = sys.getsizeof([]) + 8 * cellsCnt
+		debug(f'WK-CYK table: {cellsCnt} cells, {self.wkCykMemoryEstimate / 2**20:.1f} MB + non empty cells')
+
+		self.X = [0] * cellsCnt   # what nonterms (bitset) can generate segment specified by the indexes
+
+
+	# the table for a longer input, with the cells of the current one kept - the rows of the old table
+	# are the beginnings of the rows of the new one
+	def extend_wk_cyk_table(self, n: int) -> None:
+		oldX, oldSegCnt = self.X, self.segCnt
+		self.init_wk_cyk_table(n)
+		for segId in range(oldSegCnt):
+			self.X[segId * self.segCnt:segId * self.segCnt + oldSegCnt] = oldX[segId * oldSegCnt:(segId + 1) * oldSegCnt]
+
+
+	# flat index of the cell for the segment given by the four indexes
+	def cell_idx(self, i: int, j: int, k: int, l: int) -> int:
+		return self.segIds[i][j] * self.segCnt + self.segIds[k][l]
+
+
 	# add a nonterm to the covering set
-	def addToX(self, idx: t4DInt, nt: tNonTerm) -> None:
-		if idx not in self.X:
-			self.X[idx] = []
-		self.X[idx].append(nt)
+	def addToX(self, idx: int, nt: tNonTerm) -> None:
+		self.X[idx] |= self.cykNtBits[nt]
+
+
+	# the sets of nonterms are bitsets - every nonterm has its bit
+	# the rules with two nonterms on the right side are indexed by the bit of the first nonterm,
+	# for each left side there is a mask of the second nonterms it can be generated with - (mask, left side bit)
+	def generate_binary_rule_index(self) -> None:
+		self.cykNtBits: Dict[tNonTerm, int] = {nt: 1 << idx for idx, nt in enumerate(sorted(self.nts))}
+		secondMasks: List[Dict[int, int]] = [{} for _ in self.cykNtBits]
+		for rule in self.rules:
+			if len(rule.rhs) == 2 and is_nonterm(rule.rhs[0]) and is_nonterm(rule.rhs[1]):
+				firstIdx = self.cykNtBits[rule.rhs[0]].bit_length() - 1
+				lhsBit = self.cykNtBits[rule.lhs]
+				secondMasks[firstIdx][lhsBit] = secondMasks[firstIdx].get(lhsBit, 0) | self.cykNtBits[rule.rhs[1]]
+		self.binaryRules: List[List[Tuple[int, int]]] = [[(mask, lhsBit) for lhsBit, mask in masks.items()] for masks in secondMasks]
+
+		# results of combining two sets, the same sets are combined over and over
+		self.cykCombinations: Dict[Tuple[int, int], int] = {}
+
+
+	# nonterms generating a pair of nonterms from the two sets
+	# helper function only called from find_generating_rules
+	def _combine_sets(self, firstNts: int, secondNts: int) -> int:
+		generated = 0
+		remaining = firstNts
+		while remaining:
+			# lowest bit - one of the first nonterms
+			bit = remaining & -remaining
+			remaining ^= bit
+			for mask, lhsBit in self.binaryRules[bit.bit_length() - 1]:
+				if secondNts & mask:
+					generated |= lhsBit
+		self.cykCombinations[(firstNts, secondNts)] = generated
+		return generated
 
 
 	# find rule(s) that have nonterms from idx1, idx2 as the right side
 	# add left hand side of such rules to target set
-	def find_generating_rules(self, idx1: t4DInt, idx2: t4DInt, target: t4DInt) -> None:
-		if idx1 not in self.X or idx2 not in self.X:
+	def find_generating_rules(self, idx1: int, idx2: int, target: int) -> None:
+		firstNts, secondNts = self.X[idx1], self.X[idx2]
+		if not firstNts or not secondNts:
 			return
-		for rule in self.rules:
-			if rule.rhs[0] in self.X[idx1] and rule.rhs[1] in self.X[idx2]:
-				self.addToX(target, rule.lhs)
+		generated = self.cykCombinations.get((firstNts, secondNts))
+		if generated is None:
+			generated = self._combine_sets(firstNts, secondNts)
+		self.X[target] |= generated
 
 
 	# find non terminals that can generate term segment given by the four indexes
-	def compute_set(self, i: int, j: int, k: int ,l: int) -> None:
+	# the cells are addressed by the segment numbers - (i, s, k, t) is seg[i][s] * S + seg[k][t]
+	# only the nonterms in the mask are kept
+	def compute_set(self, i: int, j: int, k: int ,l: int, mask: int = -1) -> None:
+		seg, S = self.segIds, self.segCnt
+		upper, lower = seg[i][j] * S, seg[k][l]
+		target = upper + lower
+
 		# i = j = 0 -> segment has only lower part
 		if i == 0 and j == 0:
 			for t in range(k, l):
-				self.find_generating_rules((0, 0, k, t), (0, 0 ,t+1, l), (i, j, k, l))
+				self.find_generating_rules(seg[k][t], seg[t+1][l], target)
 
 		# k = l = 0 -> segment has only upper part
 		elif k == 0 and l == 0:
 			for s in range(i, j):
-				self.find_generating_rules((i, s, 0, 0), (s+1, j ,0 , 0), (i, j, k, l))
+				self.find_generating_rules(seg[i][s] * S, seg[s+1][j] * S, target)
 
 		# segment has symbols from both strands find all possible combinations, there are 7 types of divisions
 		else:
 			# 1. first non-term generates upper strand, the second lower...
-			self.find_generating_rules((i, j, 0, 0), (0, 0, k, l), (i, j, k, l))
+			self.find_generating_rules(upper, lower, target)
 			# 2. ... or vice versa
-			self.find_generating_rules((0, 0, k, l), (i, j, 0, 0), (i, j, k, l))
+			self.find_generating_rules(lower, upper, target)
 
 			# 3. both nonterms contain symbols from both strands
 			for s in range(i, j):
 				for t in range(k, l):
-					self.find_generating_rules((i, s, k, t), (s+1, j, t+1, l), (i, j, k, l))
+					self.find_generating_rules(seg[i][s] * S + seg[k][t], seg[s+1][j] * S + seg[t+1][l], target)
 
 			for s in range(i, j):
 				# 4. first contains whole upper and bit of lower strand, the second contains rest of lower strand...
-				self.find_generating_rules((i, s, k, l), (s+1, j, 0, 0), (i, j, k, l))
+				self.find_generating_rules(seg[i][s] * S + lower, seg[s+1][j] * S, target)
 				# 5. ...or vice versa
-				self.find_generating_rules((i, s, 0, 0), (s+1, j, k, l), (i, j, k, l))
+				self.find_generating_rules(seg[i][s] * S, seg[s+1][j] * S + lower, target)
 
 			for t in range(k, l):
 				# 6. first contains whole lower and bit of upper strand, the second contains rest of upper strand...
-				self.find_generating_rules((i, j, k, t), (0, 0, t+1, l), (i, j, k, l))
+				self.find_generating_rules(upper + seg[k][t], seg[t+1][l], target)
 				# 7. ...or vice versa
-				self.find_generating_rules((0, 0, k, t), (i, j, t+1, l), (i, j, k, l))
+				self.find_generating_rules(seg[k][t], upper + seg[t+1][l], target)
+
+		self.X[target] &= mask
+
+
+	# count of the cells of a segment shape (alpha symbols of upper and beta of lower strand)
+	def _layer_cells_cnt(self, n: int, alpha: int, beta: int) -> int:
+		return (n - alpha + 1 if alpha > 0 else 1) * (n - beta + 1 if beta > 0 else 1)
+
+
+	# what pairs of nonterms from the two sets can be used to generate a needed nonterm
+	# returns the needed nonterms of both sets
+	# helper function only called from _wk_cyk_demand
+	def _split_demand(self, needed: int, firstNts: int, secondNts: int) -> Tuple[int, int]:
+		firstNeeded, secondNeeded = 0, 0
+		remaining = firstNts
+		while remaining:
+			bit = remaining & -remaining
+			remaining ^= bit
+			for mask, lhsBit in self.binaryRules[bit.bit_length() - 1]:
+				if lhsBit & needed and mask & secondNts:
+					firstNeeded |= bit
+					secondNeeded |= mask & secondNts
+		return firstNeeded, secondNeeded
+
+
+	# which nonterms can be needed in the cells of a segment shape (a symbols of upper and b of lower strand)
+	# 1. bottom up - nonterms that can generate some segment of the shape, starting from the single symbols
+	# 2. top down from the start symbol in the whole input - nonterms of a rule whose left side is needed
+	#    in a bigger shape while the other nonterm of the rule can be generated in the rest of it
+	# the shapes don't depend on the positions, so it's much cheaper than the wk-cyk itself
+	# (still O(n^4) combinations, returns None after the time limit counted from start_time)
+	def _wk_cyk_demand(self, n: int, start_time: float) -> Optional[List[List[int]]]:
+		produced = [[0] * (n + 1) for _ in range(n + 1)]
+		for i in range(1, n + 1):
+			produced[1][0] |= self.X[self.cell_idx(i, i, 0, 0)]
+			produced[0][1] |= self.X[self.cell_idx(0, 0, i, i)]
+
+		# all splits of the shape - the same as the divisions of compute_set
+		def splits(a: int, b: int) -> Generator:
+			for a1 in range(a + 1):
+				for b1 in range(b + 1):
+					if (a1 != 0 or b1 != 0) and (a1 != a or b1 != b):
+						yield a1, b1, a - a1, b - b1
 
-
-	# the main wk-cyk function
-	# technically, double stranded string (2 strings) should be on the input, but since they have to be identical,
-	# we use one string (goalStr) in the role of upper or lower strand
-	def run_wk_cyk(self, goalStr: str) -> Optional[bool]:
-		start_time = time.time()
+		for y in range(2, 2*n+1):
+			if time.time() - start_time > self.timeLimit:
+				return None
+			for b in range(max(y - n, 0), min(n, y)+1):
+				a = y - b
+				for a1, b1, a2, b2 in splits(a, b):
+					firstNts, secondNts = produced[a1][b1], produced[a2][b2]
+					if firstNts and secondNts:
+						generated = self.cykCombinations.get((firstNts, secondNts))
+						if generated is None:
+							generated = self._combine_sets(firstNts, secondNts)
+						produced[a][b] |= generated
+
+		needed = [[0] * (n + 1) for _ in range(n + 1)]
+		needed[n][n] = produced[n][n] & self.cykNtBits[self.startSymbol]
+		demandCache: Dict[Tuple[int, int, int], Tuple[int, int]] = {}
+		for y in range(2*n, 1, -1):
+			if time.time() - start_time > self.timeLimit:
+				return None
+			for b in range(max(y - n, 0), min(n, y)+1):
+				a = y - b
+				if not needed[a][b]:
+					continue
+				for a1, b1, a2, b2 in splits(a, b):
+					firstNts, secondNts = produced[a1][b1], produced[a2][b2]
+					if firstNts and secondNts:
+						key = (needed[a][b], firstNts, secondNts)
+						if key not in demandCache:
+							demandCache[key] = self._split_demand(needed[a][b], firstNts, secondNts)
+						firstNeeded, secondNeeded = demandCache[key]
+						needed[a1][b1] |= firstNeeded
+						needed[a2][b2] |= secondNeeded
+		return needed
+
+
+	# the common start of the wk-cyk runs - the table, the nonterms of the single symbols and the demand analysis
+	# returns False if the input is rejected right away (None after the time limit counted from start_time),
+	# and the needed nonterms of shapes (None without the analysis)
+	def _init_wk_cyk(self, goalStr: str, demandAnalysis: bool, start_time: float, sparse: bool = False) -> Tuple[Optional[bool], Optional[List[List[int]]]]:
 		n = len(goalStr)
-		self.X: Dict[t4DInt, List[tNonTerm]] = {}  # what nonterms can generate segment soecified by the indexes
-
-		# the first step - finding nonterm that generate individual terms
-		# for each term in the input find the appropriate rules and add to X
-		for i, word in enumerate(goalStr):
+		self.init_wk_cyk_table(n, sparse)
+		self.generate_binary_rule_index()
+		self.wkCykSkippedCells = 0
+		self.wkCykInput: Optional[str] = None
+		self._init_wk_cyk_symbols(goalStr, 0)
+
+		if not self._wk_cyk_relation_check(goalStr):
+			self.wkCykSkippedCells = sum(self._layer_cells_cnt(n, y - beta, beta) for y in range(2, 2*n+1) for beta in range(max(y - n, 0), min(n, y)+1))
+			debug(f'WK-CYK: input symbols not complementary to themselves, {self.wkCykSkippedCells} cells skipped')
+			return False, None
+
+		needed: Optional[List[List[int]]] = None
+		if demandAnalysis:
+			needed = self._wk_cyk_demand(n, start_time)
+			if needed is None:
+				return None, None
+			for i in range(1, n + 1):
+				self.X[self.cell_idx(i, i, 0, 0)] &= needed[1][0]
+				self.X[self.cell_idx(0, 0, i, i)] &= needed[0][1]
+		return True, needed
+
+
+	# both strands are the input, so it is only a valid double stranded string if every symbol is complementary
+	# to itself - the basic WK-CYK doesn't check the relation, with wkCykRelationCheck all variants reject
+	# such inputs before computing any cell (the answers of the variants are always the same)
+	def _wk_cyk_relation_check(self, goalStr: str) -> bool:
+		return not self.wkCykRelationCheck or all(symbol in self.relDict.get(symbol, '') for symbol in set(goalStr))
+
+
+	# the first step - finding nonterm that generate individual terms
+	# for each term in the input (from the idx start on) find the appropriate rules and add to X
+	def _init_wk_cyk_symbols(self, goalStr: str, start: int) -> None:
+		for i in range(start, len(goalStr)):
+			word = goalStr[i]
 			for rule in self.rules:
 				if len(rule.rhs) == 1 and is_term(rule.rhs[0]):
 					letter = rule.rhs[0]
 					if len(letter[0]) == 1 and letter[0][0] == word:
-						self.addToX((i+1, i+1, 0, 0), rule.lhs)
+						self.addToX(self.cell_idx(i+1, i+1, 0, 0), rule.lhs)
 					elif len(letter[1]) == 1 and letter[1][0] == word:
-						self.addToX((0, 0, i+1, i+1), rule.lhs)
+						self.addToX(self.cell_idx(0, 0, i+1, i+1), rule.lhs)
+
+
+	# all cells of segments of the len y - (i, j, k, l, mask of nonterms to keep)
+	# the cells only depend on the cells of shorter segments
+	# the cells with both segments in the first known symbols are already computed and left out
+	def _level_cells(self, n: int, y: int, needed: Optional[List[List[int]]], known: int = 0) -> Generator:
+		# do the search for all segment len divisions between upper (alpha) and lower (beta) strand
+		for beta in range(max(y - n, 0), min(n, y)+1):
+			alpha = y - beta
+
+			# with the demand analysis, the cells are restricted to the needed nonterms
+			# and the shapes with no needed nonterms are skipped
+			mask = -1
+			if needed is not None:
+				mask = needed[alpha][beta]
+				if not mask:
+					self.wkCykSkippedCells += self._layer_cells_cnt(n, alpha, beta)
+					continue
+
+			if alpha == 0:
+				# symbols only in lower strand
+				for k in range(max(1, known - y + 2), n-y+2):
+					yield 0, 0, k, k + y - 1, mask
+
+			elif beta == 0:
+				# symbols only in upper strand
+				for i in range(max(1, known - y + 2), n - y + 2):
+					yield i, i + y - 1, 0, 0, mask
+
+			else:
+				# symbols in both strnads, consider all posiible distributions
+				for i in range(1, n - alpha + 2):
+					# upper segment in the known symbols - only the lower ones reaching behind them are new
+					kStart = max(1, known - beta + 2) if i + alpha - 1 <= known else 1
+					for k in range(kStart, n - beta + 2):
+						yield i, i + alpha - 1, k, k + beta - 1, mask
+
+
+	# the main wk-cyk function
+	# technically, double stranded string (2 strings) should be on the input, but since they have to be identical,
+	# we use one string (goalStr) in the role of upper or lower strand
+	# with demandAnalysis only the cells that can be used to generate the whole input are computed,
+	# the count of the others is in wkCykSkippedCells
+	def run_wk_cyk(self, goalStr: str, demandAnalysis: bool = False) -> Optional[bool]:
+		start_time = time.time()
+		n = len(goalStr)
+		feasible, needed = self._init_wk_cyk(goalStr, demandAnalysis, start_time)
+		if not feasible:
+			return None if feasible is None else False
 
 		# continuously increase the len of analysed segment
 		for y in range(2, 2*n+1):
@@ -1144,33 +2160,277 @@ class cWK_CFG:
 			if current_time - start_time > self.timeLimit:
 				return None
 
-			# do the search for all segment len divisions between upper (alpha) and lower (beta) strand
-			for beta in range(max(y - n, 0), min(n, y)+1):
-				alpha = y - beta
-
-				if alpha == 0:
-					# symbols only in lower strand
-					i = j = 0
-					for k in range(1, n-y+2):
-						l = k + y - 1
-						self.compute_set(i, j, k, l)
+			for i, j, k, l, mask in self._level_cells(n, y, needed):
+				self.compute_set(i, j, k, l, mask)
 
-				elif beta == 0:
-					# symbols only in upper strand
-					k = l = 0
-					for i in range(1, n - y + 2):
-						j = i + y - 1
-						self.compute_set(i, j, k, l)
-
-				else:
-					# symbols in both strnads, consider all posiible distributions
-					for i in range(1, n - alpha + 2):
-						for k in range(1, n - beta + 2):
-							j = i + alpha - 1
-							l = k + beta - 1
-							self.compute_set(i, j, k, l)
+		debug(f'WK-CYK: {self.wkCykSkippedCells} cells skipped')
+		# the table without the demand analysis holds all cells of the input, so it can be extended
+		if not demandAnalysis:
+			self.wkCykInput, self.wkCykRules = goalStr, self.rules
 
 		# the result is positive if
 		# 1. the set of symbols that generate the whole input is non empty
 		# 2. starting symbol is in this set
-		return (1, n, 1, n) in self.X and self.startSymbol in self.X[(1, n, 1, n)]
+		# (the table has no cell for the empty input)
+		return n > 0 and bool(self.X[self.cell_idx(1, n, 1, n)] & self.cykNtBits[self.startSymbol])
+
+
+	# wk-cyk for inputs growing by appending symbols - when the input of the last run_wk_cyk (or of this function)
+	# is a prefix of goalStr, its table is extended and only the cells covering the new symbols are computed,
+	# otherwise (or when the rules have changed since) it is the basic run_wk_cyk
+	def run_wk_cyk_incremental(self, goalStr: str) -> Optional[bool]:
+		known = getattr(self, 'wkCykInput', None)
+		# the rule sets are replaced, never changed in place, so the same object means the same rules
+		if known is None or not goalStr.startswith(known) or self.wkCykRules is not self.rules:
+			return self.run_wk_cyk(goalStr)
+		if not self._wk_cyk_relation_check(goalStr):
+			return False
+
+		start_time = time.time()
+		n, m = len(goalStr), len(known)
+		self.wkCykInput = None
+		self.extend_wk_cyk_table(n)
+		self._init_wk_cyk_symbols(goalStr, m)
+
+		for y in range(2, 2*n+1):
+			# check the time limit, if it has been exceeded return None
+			if time.time() - start_time > self.timeLimit:
+				return None
+
+			for i, j, k, l, mask in self._level_cells(n, y, None, m):
+				self.compute_set(i, j, k, l, mask)
+
+		self.wkCykInput, self.wkCykRules = goalStr, self.rules
+		return n > 0 and bool(self.X[self.cell_idx(1, n, 1, n)] & self.cykNtBits[self.startSymbol])
+
+
+	# all divisions of the segment into two - the same ones compute_set goes through
+	def _cell_splits(self, i: int, j: int, k: int, l: int) -> Generator:
+		if i == 0 and j == 0:
+			for t in range(k, l):
+				yield (0, 0, k, t), (0, 0, t+1, l)
+		elif k == 0 and l == 0:
+			for s in range(i, j):
+				yield (i, s, 0, 0), (s+1, j, 0, 0)
+		else:
+			yield (i, j, 0, 0), (0, 0, k, l)
+			yield (0, 0, k, l), (i, j, 0, 0)
+			for s in range(i, j):
+				for t in range(k, l):
+					yield (i, s, k, t), (s+1, j, t+1, l)
+			for s in range(i, j):
+				yield (i, s, k, l), (s+1, j, 0, 0)
+				yield (i, s, 0, 0), (s+1, j, k, l)
+			for t in range(k, l):
+				yield (i, j, k, t), (0, 0, t+1, l)
+				yield (0, 0, k, t), (i, j, t+1, l)
+
+
+	# nonterms that are the first nonterm of a rule with one of the left sides
+	# helper function only called from _compute_cell_on_demand
+	def _demand_firsts(self, lhsNts: int) -> int:
+		firstNts = self.cykDemandFirsts.get(lhsNts)
+		if firstNts is None:
+			firstNts = 0
+			for idx, rules in enumerate(self.binaryRules):
+				if any(lhsBit & lhsNts for _, lhsBit in rules):
+					firstNts |= 1 << idx
+			self.cykDemandFirsts[lhsNts] = firstNts
+		return firstNts
+
+
+	# nonterms that are the second nonterm of a rule with one of the left sides and one of the first nonterms
+	# helper function only called from _compute_cell_on_demand
+	def _demand_seconds(self, lhsNts: int, firstNts: int) -> int:
+		secondNts = self.cykDemandSeconds.get((lhsNts, firstNts))
+		if secondNts is None:
+			secondNts = 0
+			remaining = firstNts
+			while remaining:
+				bit = remaining & -remaining
+				remaining ^= bit
+				for mask, lhsBit in self.binaryRules[bit.bit_length() - 1]:
+					if lhsBit & lhsNts:
+						secondNts |= mask
+			self.cykDemandSeconds[(lhsNts, firstNts)] = secondNts
+		return secondNts
+
+
+	# which of the wanted nonterms generate the segment
+	# the cell is only computed for the nonterms it hasn't been asked for yet
+	def _ask_cell(self, i: int, j: int, k: int, l: int, wanted: int) -> int:
+		idx = self.cell_idx(i, j, k, l)
+		wanted &= self.cykNeeded[j - i + 1 if i else 0][l - k + 1 if k else 0]
+		newNts = wanted & ~self.cykAsked.get(idx, 0)
+		if newNts:
+			if time.time() - self.cykStartTime > self.timeLimit:
+				raise TimeoutError
+			self.cykAsked[idx] = self.cykAsked.get(idx, 0) | newNts
+			self.X[idx] |= self._compute_cell_on_demand(i, j, k, l, newNts)
+		return self.X[idx] & wanted
+
+
+	# the wanted nonterms generating the segment - the divisions are tried until all are found,
+	# the first part is asked for the first nonterms of the rules, the second part only for the nonterms
+	# that make a rule with what was found in the first part
+	def _compute_cell_on_demand(self, i: int, j: int, k: int, l: int, wanted: int) -> int:
+		generated = 0
+		for (i1, j1, k1, l1), (i2, j2, k2, l2) in self._cell_splits(i, j, k, l):
+			# the parts are mostly computed already, so the time is checked for every division
+			if time.time() - self.cykStartTime > self.timeLimit:
+				raise TimeoutError
+			remaining = wanted & ~generated
+			firstWanted = self._demand_firsts(remaining)
+			if not firstWanted:
+				break
+			firstNts = self._ask_cell(i1, j1, k1, l1, firstWanted)
+			if not firstNts:
+				continue
+			secondWanted = self._demand_seconds(remaining, firstNts)
+			if not secondWanted:
+				continue
+			secondNts = self._ask_cell(i2, j2, k2, l2, secondWanted)
+			if not secondNts:
+				continue
+			combined = self.cykCombinations.get((firstNts, secondNts))
+			if combined is None:
+				combined = self._combine_sets(firstNts, secondNts)
+			generated |= combined & remaining
+			if generated == wanted:
+				break
+		return generated
+
+
+	# agenda driven wk-cyk - the cells are computed top down on demand, starting with the start symbol in the whole
+	# input, only for the nonterms asked for that can be used to derive the start symbol (the demand analysis)
+	# the search of a cell stops as soon as all the asked nonterms are found - the start symbol in the whole
+	# input ends the run, the cells nobody asked for are never computed (their count is in wkCykSkippedCells),
+	# the table is sparse - only the asked cells are stored
+	def run_wk_cyk_agenda(self, goalStr: str) -> Optional[bool]:
+		self.cykStartTime = time.time()
+		n = len(goalStr)
+		feasible, needed = self._init_wk_cyk(goalStr, True, self.cykStartTime, True)
+		if not feasible or n == 0 or needed is None:
+			return None if feasible is None else False
+
+		self.cykNeeded = needed
+		self.cykAsked: Dict[int, int] = {}    # nonterms the cells have been computed for (only the asked cells)
+		for i in range(1, n + 1):
+			# single symbols are known
+			self.cykAsked[self.cell_idx(i, i, 0, 0)] = -1
+			self.cykAsked[self.cell_idx(0, 0, i, i)] = -1
+		self.cykDemandFirsts: Dict[int, int] = {}
+		self.cykDemandSeconds: Dict[Tuple[int, int], int] = {}
+
+		try:
+			result = bool(self._ask_cell(1, n, 1, n, self.cykNtBits[self.startSymbol]))
+		except TimeoutError:
+			return None
+
+		cellsCnt = sum(self._layer_cells_cnt(n, y - beta, beta) for y in range(2, 2*n+1) for beta in range(max(y - n, 0), min(n, y)+1))
+		self.wkCykSkippedCells = cellsCnt - (len(self.cykAsked) - 2 * n)
+		debug(f'WK-CYK: {self.wkCykSkippedCells} cells skipped')
+		return result
+
+
+	# wk-cyk with the cells of each segment len computed by several processes (one per CPU core by default)
+	# the cells of one len only depend on the shorter ones - the processes split them and synchronize (barrier)
+	# before the next len, the computed cells are exchanged through a table in shared memory (bitsets as bytes),
+	# each process keeps a copy of the table in its own X
+	def run_wk_cyk_parallel(self, goalStr: str, workers: Optional[int] = None, demandAnalysis: bool = False) -> Optional[bool]:
+		workers = self.worker_cnt(workers)
+
+		# the processes get the grammar and the table by forking
+		try:
+			context = multiprocessing.get_context('fork')
+		except ValueError:
+			return self.run_wk_cyk(goalStr, demandAnalysis)
+
+		start_time = time.time()
+		n = len(goalStr)
+		feasible, needed = self._init_wk_cyk(goalStr, demandAnalysis, start_time)
+		if not feasible or n == 0:
+			return None if feasible is None else False
+
+		cellBytes = max((len(self.cykNtBits) + 7) // 8, 1)
+		sharedTable: Any = context.RawArray('B', len(self.X) * cellBytes)
+		self.wkCykMemoryEstimate += len(self.X) * cellBytes
+		barrier: Any = context.Barrier(workers)
+		stop: Any = context.Value('b', False)
+		skipped: Any = context.Value('q', 0)
+
+		processes = [context.Process(target=self._run_wk_cyk_worker, args=(n, needed, idx, workers, sharedTable, cellBytes, barrier, stop, skipped, start_time), daemon=True) for idx in range(workers)]
+		for process in processes:
+			process.start()
+
+		# every process stops on its own after the time limit (checked between the lens), the margin covers the last len
+		for process in processes:
+			process.join(max(self.timeLimit + 10 - (time.time() - start_time), 0))
+		if any(process.is_alive() for process in processes):
+			for process in processes:
+				process.terminate()
+				process.join()
+			return None
+		if stop.value or any(process.exitcode != 0 for process in processes):
+			return None
+
+		self.wkCykSkippedCells = skipped.value
+		debug(f'WK-CYK: {self.wkCykSkippedCells} cells skipped')
+
+		# the result is positive if the starting symbol is in the set of the whole input
+		idx = self.cell_idx(1, n, 1, n)
+		return bool(int.from_bytes(bytes(sharedTable[idx * cellBytes:(idx + 1) * cellBytes]), 'little') & self.cykNtBits[self.startSymbol])
+
+
+	# one process of the parallel wk-cyk - computes every workers-th cell of each len
+	def _run_wk_cyk_worker(self, n: int, needed: Optional[List[List[int]]], workerIdx: int, workers: int, sharedTable: Any, cellBytes: int, barrier: Any, stop: Any, skipped: Any, start_time: float) -> None:
+		table = memoryview(sharedTable).cast('B')
+		try:
+			for y in range(2, 2*n+1):
+				cells = list(self._level_cells(n, y, needed))
+
+				# check the time limit, if it has been exceeded, all the processes stop after the barrier
+				if time.time() - start_time > self.timeLimit:
+					stop.value = True
+				else:
+					for cellNo in range(workerIdx, len(cells), workers):
+						i, j, k, l, mask = cells[cellNo]
+						self.compute_set(i, j, k, l, mask)
+						idx = self.cell_idx(i, j, k, l)
+						table[idx * cellBytes:(idx + 1) * cellBytes] = self.X[idx].to_bytes(cellBytes, 'little')
+
+				barrier.wait()
+				if stop.value:
+					return
+
+				# the cells computed by the others
+				for cellNo, (i, j, k, l, _) in enumerate(cells):
+					if cellNo % workers != workerIdx:
+						idx = self.cell_idx(i, j, k, l)
+						self.X[idx] = int.from_bytes(table[idx * cellBytes:(idx + 1) * cellBytes], 'little')
+
+			if workerIdx == 0:
+				skipped.value = self.wkCykSkippedCells
+		except Exception:
+			# don't let the others wait at the barrier
+			stop.value = True
+			barrier.abort()
+			raise
+		finally:
+			table.release()
+
+
+	# wk-cyk with the table in numpy arrays, computed a layer at a time (see lib/wk_cyk_numpy.py)
+	# gives the same results as run_wk_cyk, if numpy is not installed, run_wk_cyk is used
+	# memoryBudget (bytes) limits the layers kept in memory, the rest go to memory mapped files in spillDir
+	# (the default temp directory if None - on tmpfs give a directory on a disk)
+	def run_wk_cyk_numpy(self, goalStr: str, memoryBudget: Optional[int] = None, spillDir: Optional[str] = None) -> Optional[bool]:
+		if np is None:
+			return self.run_wk_cyk(goalStr)
+		if not self._wk_cyk_relation_check(goalStr):
+			return False
+		engine = cNumpyWkCyk(self, memoryBudget, spillDir)
+		result = engine.run(goalStr)
+		self.wkCykMemoryEstimate = engine.memoryEstimate
+		debug(f'WK-CYK table: {engine.memoryEstimate / 2**20:.1f} MB, {engine.spilledBytes / 2**20:.1f} MB in files')
+		return result
@@ -0,0 +1,89 @@
+# Author: Jan Hammer, xhamme00@stud.fit.vutbr.cz
+# Project: WK Grammar Tree Search
+# Open lists (frontiers) for the tree search - all have put(node), get() and len()
+
+from collections import deque
+from heapq import heappush, heappop
+from queue import PriorityQueue
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# binary heap ordered by node precedence, ties are taken in the order of insertion
+# the search is single threaded so unlike queue.PriorityQueue no locking is needed
+class cHeapFrontier:
+	def __init__(self) -> None:
+		self.heap: List[Tuple[int, int, Any]] = []
+		self.counter = 0   # tiebreak, nodes themselves are never compared
+
+	def put(self, node: Any) -> None:
+		heappush(self.heap, (node.precedence, self.counter, node))
+		self.counter += 1
+
+	def get(self) -> Any:
+		return heappop(self.heap)[2]
+
+	def __len__(self) -> int:
+		return len(self.heap)
+
+
+# plain queue ignoring precedence - breadth first search, for uniform priorities (e.g. NONE heuristic)
+class cFifoFrontier:
+	def __init__(self) -> None:
+		self.queue: Deque[Any] = deque()
+
+	def put(self, node: Any) -> None:
+		self.queue.append(node)
+
+	def get(self) -> Any:
+		return self.queue.popleft()
+
+	def __len__(self) -> int:
+		return len(self.queue)
+
+
+# bucket queue - node precedences are small integers, so keep a queue of nodes for every value
+# put is O(1), get is O(1) unless the lowest bucket runs out, then the next lowest value is looked up
+# ties are taken in the order of insertion, the same as with the heap
+class cBucketFrontier:
+	def __init__(self) -> None:
+		self.buckets: Dict[int, Deque[Any]] = {}
+		self.minPrecedence: Optional[int] = None
+		self.size = 0
+
+	def put(self, node: Any) -> None:
+		bucket = self.buckets.get(node.precedence)
+		if bucket is None:
+			bucket = self.buckets[node.precedence] = deque()
+			if self.minPrecedence is None or node.precedence < self.minPrecedence:
+				self.minPrecedence = node.precedence
+		bucket.append(node)
+		self.size += 1
+
+	def get(self) -> Any:
+		bucket = self.buckets[self.minPrecedence]
+		node = bucket.popleft()
+		self.size -= 1
+		if not bucket:
+			# only the values currently in the queue are kept, there are few of them
+			del self.buckets[self.minPrecedence]
+			self.minPrecedence = min(self.buckets) if self.buckets else None
+		return node
+
+	def __len__(self) -> int:
+		return self.size
+
+
+# the original open list - thread safe queue.PriorityQueue, kept for comparison
+class cPriorityQueueFrontier:
+	def __init__(self) -> None:
+		self.queue: Any = PriorityQueue()
+		self.counter = 0
+
+	def put(self, node: Any) -> None:
+		self.queue.put((node.precedence, self.counter, node))
+		self.counter += 1
+
+	def get(self) -> Any:
+		return self.queue.get()[2]
+
+	def __len__(self) -> int:
+		return self.queue.qsize()
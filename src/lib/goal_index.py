@@ -0,0 +1,89 @@
+# Author: Jan Hammer, xhamme00@stud.fit.vutbr.cz
+# Project: WK Grammar Tree Search
+# Index of the input string, built once per search and consulted by the pruning and node precedence functions
+
+from bisect import bisect_left, bisect_right
+from operator import eq
+from typing import Dict, List, Tuple
+
+# max entries of each cache - the keys are pieces of the words (whole heads for the roots), a long search would
+# fill the memory with them, so a full cache is cleared and filled again with what the search asks now
+CACHE_SIZE = 100000
+
+# the tree search asks the same questions about the input over and over (the pieces of the word are
+# mostly upper strands of the rules), so the answers are computed on the first use and cached
+class cGoalIndex:
+	def __init__(self, goal: str) -> None:
+		self.goal = goal
+
+		# positions of every symbol of the input
+		self.symbolPositions: Dict[str, List[int]] = {}
+		for idx, symbol in enumerate(goal):
+			self.symbolPositions.setdefault(symbol, []).append(idx)
+
+		self.occurrences: Dict[str, List[int]] = {}           # piece -> sorted positions where it occurs
+		self.matchLens: Dict[Tuple[str, int], int] = {}       # (piece, idx) -> how many symbols match from idx
+		self.matchCnts: Dict[Tuple[str, int], int] = {}       # (piece, idx) -> how many symbols are equal at the same idx
+
+	# sorted positions where the piece occurs in the input
+	def occurrences_of(self, piece: str) -> List[int]:
+		positions = self.occurrences.get(piece)
+		if positions is None:
+			if not piece:
+				positions = list(range(len(self.goal) + 1))
+			else:
+				# candidates are the positions of the first symbol
+				goal = self.goal
+				positions = [idx for idx in self.symbolPositions.get(piece[0], []) if goal.startswith(piece, idx)]
+			if len(self.occurrences) >= CACHE_SIZE:
+				self.occurrences.clear()
+			self.occurrences[piece] = positions
+		return positions
+
+	# the first occurrence of the piece starting at start or later, -1 if there is none
+	def find(self, piece: str, start: int) -> int:
+		positions = self.occurrences_of(piece)
+		i = bisect_left(positions, start)
+		return positions[i] if i < len(positions) else -1
+
+	# the last occurrence of the piece ending at end or sooner, -1 if there is none
+	def rfind(self, piece: str, end: int) -> int:
+		positions = self.occurrences_of(piece)
+		i = bisect_right(positions, end - len(piece))
+		return positions[i - 1] if i > 0 else -1
+
+	# does the piece occur at the idx?
+	def occurs_at(self, piece: str, idx: int) -> bool:
+		return self.match_len(piece, idx) == len(piece)
+
+	# is the piece the end of the input?
+	def is_suffix(self, piece: str) -> bool:
+		return self.occurs_at(piece, len(self.goal) - len(piece)) if len(piece) <= len(self.goal) else False
+
+	# how many symbols of the piece match the input from the idx on (until the first mismatch)
+	def match_len(self, piece: str, idx: int) -> int:
+		key = (piece, idx)
+		matched = self.matchLens.get(key)
+		if matched is None:
+			if self.goal.startswith(piece, idx):
+				matched = len(piece)
+			else:
+				matched = 0
+				for symbol1, symbol2 in zip(piece, self.goal[idx:]):
+					if symbol1 != symbol2:
+						break
+					matched += 1
+			if len(self.matchLens) >= CACHE_SIZE:
+				self.matchLens.clear()
+			self.matchLens[key] = matched
+		return matched
+
+	# how many symbols of the piece are equal to the input symbol at the same idx
+	def match_cnt(self, piece: str, idx: int) -> int:
+		key = (piece, idx)
+		matched = self.matchCnts.get(key)
+		if matched is None:
+			if len(self.matchCnts) >= CACHE_SIZE:
+				self.matchCnts.clear()
+			matched = self.matchCnts[key] = sum(map(eq, piece, self.goal[idx:idx + len(piece)]))
+		return matched
@@ -124,6 +124,28 @@ class cPerfTester:
 		print(f'|{"="*150}|\n\n\n')
 
 
+	# iterates over all open lists (frontiers) in the grammar, runs tree search for each one, prints results
+	def run_frontier_test(self, grammar, inputStr, shouldAccept, times=1):
+		self.testCnt += 1
+		self.printHeader(grammar, inputStr, shouldAccept, " OPEN LIST" + " "*54)
+		activeFrontier = grammar.currentFrontier
+
+		# run test for each item from frontierList
+		for idx, t in enumerate(grammar.frontierList):
+			grammar.currentFrontier = idx
+			statesOpen, statesAll, prunes, timeTaken, result = self.run_test_ntimes(grammar, inputStr, shouldAccept, times)
+			frontier = grammar.frontierList[idx][0]
+			statesStr = str(statesOpen) + ' + ' + str(statesAll-statesOpen)
+			prunesStr = str(prunes).replace('[', '').replace(']', '')
+
+			# save and print result
+			self.allResults[idx].update(timeTaken, statesOpen, statesAll-statesOpen, result == 'TIMEOUT', len(inputStr))
+			print(f'| {frontier:63}| {timeTaken:9} | {statesStr:21} | {prunesStr:36} | {result:8} |')
+
+		grammar.currentFrontier = activeFrontier
+		print(f'|{"="*150}|\n\n\n')
+
+
 	# iterates over all pruning heuristics, turns them off one at a time
 	def run_prune_test(self, grammar, inputStr, shouldAccept, times=1):
 
@@ -180,7 +202,7 @@ class cPerfTester:
 
 
 	# runs a wk-cyk test with increasing length of input
-	def run_wk_cyk_test(self, grammar, input_gen_func, shouldAccept):
+	def run_wk_cyk_test(self, grammar, input_gen_func, shouldAccept, useNumpy=False):
 		self.testCnt += 1
 		self.printHeader(grammar, None, shouldAccept, " INPUT LENGTH" + " "*51)
 		resultObj = cResult(self.testCnt)
@@ -190,7 +212,7 @@ class cPerfTester:
 			# input_gen_func generates inputs of inreasing lengths
 			inputStr = next(input_gen_func)
 			start = time.time()
-			result = grammar.run_wk_cyk(inputStr)
+			result = grammar.run_wk_cyk_numpy(inputStr) if useNumpy else grammar.run_wk_cyk(inputStr)
 			end = time.time()
 			timeTaken = round(end - start, 2)
 			statesStr = prunesStr = 'N/A'
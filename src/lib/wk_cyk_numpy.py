@@ -0,0 +1,190 @@
+# Author: Jan Hammer, xhamme00@stud.fit.vutbr.cz
+# Project: WK Grammar Tree Search
+# WK-CYK computed with NumPy arrays - a whole layer of the table (all segments of the same shape) at once
+
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# numpy is optional, without it cWK_CFG.run_wk_cyk_numpy falls back to the basic WK-CYK
+try:
+	import numpy as np
+	from numpy.lib.stride_tricks import as_strided
+except ImportError:
+	np = None
+
+# the table is split into layers by the shape of the segment - a symbols of the upper and b of the lower strand
+# layer (a, b) is a boolean array [i, k, nonterm] indexed by the (0 based) starts of the segment in both strands,
+# a strand without symbols has the dimension of size 1 (broadcasted when combined)
+# every segment is a combination of two smaller ones - (a1, b1) at the same starts and (a - a1, b - b1) right behind
+# it, all the splits (a1, b1) except (0, 0) and (a, b) cover the seven types of divisions of the basic WK-CYK
+# with memoryBudget (bytes) the stored layers that do not fit in it are kept in memory mapped files in a temporary
+# directory, the operating system then keeps in memory only the parts that are being combined
+# the directory is created in spillDir (the default temp directory if None) - it should be on a disk,
+# on tmpfs the files are in memory (or swap) anyway
+class cNumpyWkCyk:
+	def __init__(self, grammar: Any, memoryBudget: Optional[int] = None, spillDir: Optional[str] = None) -> None:
+		self.ntList = sorted(grammar.nts)
+		self.ntIdx = {nt: idx for idx, nt in enumerate(self.ntList)}
+		self.startIdx = self.ntIdx[grammar.startSymbol]
+		self.timeLimit = grammar.timeLimit
+		self.memoryBudget = memoryBudget
+		self.spillDir = spillDir
+		self.memoryEstimate = 0      # bytes of the stored layers
+		self.spilledBytes = 0        # of them in the memory mapped files
+
+		# rules generating one term - (left side idx, upper strand, lower strand)
+		self.termRules: List[Tuple[int, List[str], List[str]]] = []
+		# rules generating two nonterms - every right side pair has a column in the layers
+		pairIdx: Dict[Tuple[str, str], int] = {}
+		binaryRules: List[Tuple[int, str]] = []
+		for rule in grammar.rules:
+			if len(rule.rhs) == 1 and isinstance(rule.rhs[0], tuple):
+				self.termRules.append((self.ntIdx[rule.lhs], rule.rhs[0][0], rule.rhs[0][1]))
+			elif len(rule.rhs) == 2 and not isinstance(rule.rhs[0], tuple) and not isinstance(rule.rhs[1], tuple):
+				pair = (rule.rhs[0], rule.rhs[1])
+				if pair not in pairIdx:
+					pairIdx[pair] = len(pairIdx)
+				binaryRules.append((pairIdx[pair], rule.lhs))
+
+		self.pairsCnt = len(pairIdx)
+		if np is None:
+			return
+		pairs = sorted(pairIdx, key=lambda pair: pairIdx[pair])
+		self.firstIdxs = np.array([self.ntIdx[first] for first, _ in pairs], dtype=np.intp)
+		self.secondIdxs = np.array([self.ntIdx[second] for _, second in pairs], dtype=np.intp)
+		# pair -> left sides generating it
+		self.pairLhs = np.zeros((self.pairsCnt, len(self.ntList)), dtype=np.float32)
+		for idx, lhs in binaryRules:
+			self.pairLhs[idx, self.ntIdx[lhs]] = 1
+
+
+	# nonterms generating the single symbols - layers (1, 0) and (0, 1)
+	def init_layers(self, goalStr: str) -> Tuple[Any, Any]:
+		n, ntCnt = len(goalStr), len(self.ntList)
+		goal = np.array(list(goalStr))
+		upper = np.zeros((n, 1, ntCnt), dtype=bool)
+		lower = np.zeros((1, n, ntCnt), dtype=bool)
+		for lhsIdx, upperStrand, lowerStrand in self.termRules:
+			# the same as in cWK_CFG.run_wk_cyk - upper strand is tried first
+			inUpper = goal == upperStrand[0] if len(upperStrand) == 1 else np.zeros(n, dtype=bool)
+			inLower = goal == lowerStrand[0] if len(lowerStrand) == 1 else np.zeros(n, dtype=bool)
+			upper[inUpper, 0, lhsIdx] = True
+			lower[0, inLower & ~inUpper, lhsIdx] = True
+		return upper, lower
+
+
+	# zeroed array for the stored layers - in memory while it fits in the budget, memory mapped file otherwise
+	# (a new file reads as zeros)
+	def alloc_layers(self, shape: Tuple[int, ...], spillDir: Any) -> Any:
+		size = int(np.prod(shape))
+		self.memoryEstimate += size
+		if self.memoryBudget is None or self.memoryEstimate - self.spilledBytes <= self.memoryBudget:
+			return np.zeros(shape, dtype=bool)
+		self.spilledBytes += size
+		if spillDir[0] is None:
+			spillDir[0] = tempfile.TemporaryDirectory(prefix='wk_cyk_', dir=self.spillDir)
+		return np.memmap(os.path.join(spillDir[0].name, f'layers{len(os.listdir(spillDir[0].name))}.bin'), dtype=bool, mode='w+', shape=shape)
+
+
+	# nonterms of a layer from the pairs found by combining the smaller layers
+	def pairs_to_nts(self, pairsFound: Any) -> Any:
+		rows, cols = pairsFound.shape[:2]
+		return (pairsFound.reshape(rows * cols, self.pairsCnt).astype(np.float32) @ self.pairLhs > 0).reshape(rows, cols, len(self.ntList))
+
+
+	# rows of a layer computed at once - with memoryBudget the working arrays of the rows (the combined pairs of all
+	# the splits with the same a1, the pairs found and their conversion to nonterms) fit in it, but at least one row
+	# is computed, the budget is then used twice at most - by the stored layers and by the working arrays
+	def block_rows(self, rows: int, cols: int, b: int) -> int:
+		if self.memoryBudget is None:
+			return rows
+		rowBytes = cols * ((b + 6) * self.pairsCnt + 5 * len(self.ntList))
+		return max(1, min(rows, self.memoryBudget // rowBytes))
+
+
+	# the rows rowStart..rowEnd - 1 of layer (a, b) - the nonterms of its segments from all their splits
+	def compute_block(self, firsts: Dict[int, Any], seconds: Dict[int, Any], a: int, b: int, rowStart: int, rowEnd: int, cols: int) -> Any:
+		rows = rowEnd - rowStart
+		pairsFound = np.zeros((rows, cols, self.pairsCnt), dtype=bool)
+
+		for a1 in range(a + 1):
+			a2 = a - a1
+			# splits (a1, b1) for all b1 but the empty first or second part
+			b1Low = 1 if a1 == 0 else 0
+			b1High = b - 1 if a1 == a else b
+			if b1Low > b1High:
+				continue
+			splitsCnt = b1High - b1Low + 1
+
+			# first parts - the same starts, a strand without symbols has only one row
+			first = firsts[a1][b1Low:b1High + 1, rowStart:rowEnd, :cols] if a1 > 0 else firsts[a1][b1Low:b1High + 1, :1, :cols]
+
+			# second parts - b2 = b - b1 goes down while the lower strand start (k + b1) goes up,
+			# the view walks the diagonal of the array
+			second = seconds[a2][b - b1Low:, a1 + rowStart if a2 > 0 else 0:, b1Low:]
+			strides = second.strides
+			second = as_strided(second, shape=(splitsCnt, rows if a2 > 0 else 1, cols, self.pairsCnt),
+								strides=(strides[2] - strides[0], strides[1], strides[2], strides[3]), writeable=False)
+
+			pairsFound |= np.logical_and(first, second).any(axis=0)
+
+		return self.pairs_to_nts(pairsFound)
+
+
+	# the main function, returns None after the time limit
+	def run(self, goalStr: str) -> Optional[bool]:
+		self.memoryEstimate = self.spilledBytes = 0
+		if len(goalStr) == 0:
+			return False
+		spillDir: List[Any] = [None]    # created with the first spilled array
+		try:
+			return self._run(goalStr, spillDir)
+		finally:
+			if spillDir[0] is not None:
+				spillDir[0].cleanup()
+
+
+	def _run(self, goalStr: str, spillDir: List[Any]) -> Optional[bool]:
+		start_time = time.time()
+		n = len(goalStr)
+
+		# the layers are kept in the form the combination needs - the columns of the first and the second nonterms
+		# of the pairs, all layers with the same a in one array [b, i, k, pair], so that all the splits (a1, *)
+		# can be combined at once - the k dimension has n + 1 items, b = 0 layers are repeated over it
+		firsts: Dict[int, Any] = {}
+		seconds: Dict[int, Any] = {}
+
+		def store(a: int, b: int, rowStart: int, layer: Any) -> None:
+			if a not in firsts:
+				rows = n - a + 1 if a > 0 else 1
+				firsts[a] = self.alloc_layers((n + 1, rows, n + 1, self.pairsCnt), spillDir)
+				seconds[a] = self.alloc_layers((n + 1, rows, n + 1, self.pairsCnt), spillDir)
+			rowEnd = rowStart + layer.shape[0]
+			cols = layer.shape[1] if b > 0 else n + 1
+			firsts[a][b, rowStart:rowEnd, :cols] = layer[:, :, self.firstIdxs]
+			seconds[a][b, rowStart:rowEnd, :cols] = layer[:, :, self.secondIdxs]
+
+		upper, lower = self.init_layers(goalStr)
+		store(1, 0, 0, upper)
+		store(0, 1, 0, lower)
+
+		# continuously increase the len of analysed segment
+		for y in range(2, 2*n+1):
+			# check the time limit, if it has been exceeded return None
+			if time.time() - start_time > self.timeLimit:
+				return None
+
+			for b in range(max(y - n, 0), min(n, y)+1):
+				a = y - b
+				rows = n - a + 1 if a > 0 else 1
+				cols = n - b + 1 if b > 0 else 1
+				blockRows = self.block_rows(rows, cols, b)
+				for rowStart in range(0, rows, blockRows):
+					layer = self.compute_block(firsts, seconds, a, b, rowStart, min(rows, rowStart + blockRows), cols)
+					if y == 2*n:
+						return bool(layer[0, 0, self.startIdx])
+					store(a, b, rowStart, layer)
+
+		return False
@@ -15,9 +15,16 @@ testNo = 1
 # parameters 1. the word before  2. idx of the nonterm to be replaced  3. word that replaces  4. expected string (after stringification)
 def runTest(word: tWord, ntIdx: int, ruleRhs: tWord, expected: str) -> None:
 	global testNo
-	g = cWK_CFG(['A'], [], 'A' , [], [])
-	actual = wordToStr(g.apply_rule(word, ntIdx, rule))
+	g = cWK_CFG(['A', 'B', 'S'], [], 'A' , [], [])
+	actual = wordToStr(g.expand_word(g.apply_rule(g.compact_word(word), ntIdx, g.compact_word(rule))))
 	status = RES_OK if actual == expected else RES_FAILED
+
+	# when the first nonterm is replaced, the search uses the linked word - it must give the same result
+	if ntIdx == min(idx for idx, letter in enumerate(word) if is_nonterm(letter)):
+		head, tail = g.split_word(g.compact_word(word))
+		node = cTreeNode(*g.apply_rule_leftmost(head, tail, g.compact_word(rule)), 0, 0, 0, None, 0)
+		if wordToStr(g.expand_word(node.word)) != expected:
+			status = RES_FAILED
 	print(f'| TEST {testNo:2} | {wordToStr(word):20} | {ntIdx:6} | {word[ntIdx] + " -> " + wordToStr(rule):20} | {expected:20} | {actual:20} | {status:15}   |')
 	testNo += 1
 
@@ -23,26 +23,23 @@ def runTest(grammar, inputStr, expected, toCNF, runWKCYK):
 	global testNo
 
 	note = ''
+	form = grammar
 	if toCNF or runWKCYK:
-		grammar.backup()
-		grammar.to_wk_cnf()
+		form = grammar.get_wk_cnf()
 		note = 'CNF'
 
 	if runWKCYK:
 		start = time.time()
-		openStates, closedStates, actual = 0, 0, grammar.run_wk_cyk(inputStr)
+		openStates, closedStates, actual = 0, 0, form.run_wk_cyk(inputStr)
 		end = time.time()
 		note = 'WK-CYK'
 	else:
 		start = time.time()
-		openStates, closedStates, _, actual = grammar.run_tree_search(inputStr)
+		openStates, closedStates, _, actual = form.run_tree_search(inputStr)
 		end = time.time()
 
 	timeTaken = round(end - start, 8)
 
-	if toCNF or runWKCYK:
-		grammar.restore()
-
 	if actual is None:
 		status = RES_TIMEOUT
 		actual = ''
@@ -99,4 +96,116 @@ for toCnf, runWkCyk in [(False, False), (False, True), (True, False)]:
 	for m, n in [(m, n) for m in range(1, 7) for n in range (1, 7)]:
 		runTest(g16, 'a'*n + 'b'*m + 'a'*n, 2*n <= m and m <= 3*n, toCnf, runWkCyk)
 
+############################ WK-CYK VARIANTS - the same results as run_wk_cyk     #########################################################
+
+# the incremental variant is run on all prefixes of the input, the result is the list of their results
+def incrementalRun(grammar, inputStr):
+	grammar.wkCykInput = None
+	return [grammar.run_wk_cyk_incremental(inputStr[:idx]) for idx in range(len(inputStr) + 1)]
+
+def basicIncrementalRun(grammar, inputStr):
+	return [grammar.run_wk_cyk(inputStr[:idx]) for idx in range(len(inputStr) + 1)]
+
+variants = [
+	('NUMPY', lambda g, s: g.run_wk_cyk_numpy(s), None),
+	('DEMAND', lambda g, s: g.run_wk_cyk(s, True), None),
+	('PARAL', lambda g, s: g.run_wk_cyk_parallel(s, 2), None),
+	('AGENDA', lambda g, s: g.run_wk_cyk_agenda(s), None),
+	('INCR', incrementalRun, basicIncrementalRun),
+	('NP-MEM', lambda g, s: g.run_wk_cyk_numpy(s, 64), None)      # all layers but the first go to the files
+]
+
+# parameters 1. grammar  2. input  3. name of the variant  4. the variant  5. what it is compared with (run_wk_cyk by default)
+def runVariantTest(grammar, inputStr, name, variant, basic):
+	global testNo
+
+	form = grammar.get_wk_cnf()
+	expected = basic(form, inputStr) if basic is not None else form.run_wk_cyk(inputStr)
+	start = time.time()
+	actual = variant(form, inputStr)
+	timeTaken = round(time.time() - start, 8)
+
+	status = RES_OK if actual == expected else RES_FAILED
+	if basic is not None:
+		# only the result of the whole input is printed
+		expected, actual = expected[-1], actual[-1]
+	if actual is None:
+		status = RES_TIMEOUT
+		actual = ''
+
+	print(f'| TEST {testNo:3}  | {grammar.desc:35} | {inputStr:40} |   {expected:6}   |  {actual:6}  | {0:10} {0:10} | {timeTaken:12} | {name:6} | {status:16} |')
+	testNo += 1
+
+for name, variant, basic in variants:
+	for grammar, inputStr in [(g1, 'aaaaaaa'), (g1, 'aaaaaa'), (g6, 'aaabbb'), (g6, 'aaabbbb'), (g12, 'rrdduurr'), (g12, 'rrdduuurr'),
+							  (g14, 'aabbbccddd'), (g14, 'aabbbccdd'), (g15, 'abbcabb'), (g15, 'abbcaba'), (g16, 'abbba'), (g16, 'abbbba')]:
+		runVariantTest(grammar, inputStr, name, variant, basic)
+
+############################ WK-CNF FORMS - get_wk_cnf of a grammar already in WK-CNF     ###################################################
+
+# the WK-CNF form of the grammar and the form of the form
+for grammar, accepted, rejected in [(g1.get_wk_cnf(), 'aaaaa', 'aaaa'), (g6.get_wk_cnf().get_wk_cnf(), 'aaabbb', 'aaabb')]:
+	for toCnf, runWkCyk in [(True, False), (False, True)]:
+		runTest(grammar, accepted, True, toCnf, runWkCyk)
+		runTest(grammar, rejected, False, toCnf, runWkCyk)
+
+# the grammar transformed in place
+g6.backup()
+g6.to_wk_cnf()
+for toCnf, runWkCyk in [(True, False), (False, True)]:
+	runTest(g6, 'aabb', True, toCnf, runWkCyk)
+	runTest(g6, 'aabbb', False, toCnf, runWkCyk)
+g6.restore()
+
+############################ PARALLEL TREE SEARCH - the same results as run_tree_search     #################################################
+
+searches = [
+	('PORTF', lambda g, s: g.run_tree_search_portfolio(s, None, 2)),
+	('PORTF1', lambda g, s: g.run_tree_search_portfolio(s, [{'NTA+TM1': True}, {'TM3': True}], 1)),
+	('TSPAR', lambda g, s: g.run_tree_search_parallel(s, 2)),
+	('TSPAR1', lambda g, s: g.run_tree_search_parallel(s, 1))
+]
+
+# parameters 1. grammar  2. input  3. expected result  4. name of the search  5. the search
+def runSearchTest(grammar, inputStr, expected, name, search):
+	global testNo
+
+	basic = grammar.run_tree_search(inputStr)[3]
+	start = time.time()
+	openStates, closedStates, _, actual = search(grammar, inputStr)
+	timeTaken = round(time.time() - start, 8)
+
+	if actual is None:
+		status = RES_TIMEOUT
+		actual = ''
+	else:
+		status = RES_OK if actual == expected and actual == basic else RES_FAILED
+
+	print(f'| TEST {testNo:3}  | {grammar.desc:35} | {inputStr:40} |   {expected:6}   |  {actual:6}  | {openStates:10} {closedStates:10} | {timeTaken:12} | {name:6} | {status:16} |')
+	testNo += 1
+
+# parameters 1. grammar  2. name of the search  3. the search  4. count of workers - lower than 1 must not be accepted
+def runWorkersTest(grammar, name, search, workers):
+	global testNo
+
+	try:
+		search(grammar, 'a', workers)
+		status = RES_FAILED
+	except ValueError:
+		status = RES_OK
+
+	print(f'| TEST {testNo:3}  | {grammar.desc:35} | {"workers = " + str(workers):40} |   {"":6}   |  {"":6}  | {0:10} {0:10} | {0:12} | {name:6} | {status:16} |')
+	testNo += 1
+
+for name, search in searches:
+	for grammar, inputStr, expected in [(g1, 'aaaaaaa', True), (g1, 'aaaaaa', False), (g6, 'aaabbb', True), (g6, 'aaabbbb', False),
+										(g12, 'rrdduurr', True), (g12, 'rrdduuurr', False), (g15, 'abbcabb', True), (g15, 'abbcaba', False)]:
+		runSearchTest(grammar, inputStr, expected, name, search)
+
+runWorkersTest(g1, 'PORTF', lambda g, s, w: g.run_tree_search_portfolio(s, None, w), 0)
+for workers in [0, -1]:
+	runWorkersTest(g1, 'TSPAR', lambda g, s, w: g.run_tree_search_parallel(s, w), workers)
+
+runWorkersTest(g1, 'PARAL', lambda g, s, w: g.get_wk_cnf().run_wk_cyk_parallel(s, w), 0)
+
 print(hline)
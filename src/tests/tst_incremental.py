@@ -0,0 +1,91 @@
+# Author: Jan Hammer, xhamme00@stud.fit.vutbr.cz
+# Project: WK Grammar Tree Search
+# Testing of the incremental node evaluation - precedence and pruning of the nodes derived from the parent must give
+# the same results as the same words scanned from scratch
+
+import sys
+sys.path.append("../")
+
+from lib.ctf_WK_grammar import *
+from lib.grammars import *
+
+RES_OK = '\033[92m' + 'OK' + '\x1b[0m'
+RES_FAILED = '\033[91m' + 'FAILED' + '\x1b[0m'
+
+MAX_NODES = 500    # successors checked for each heuristic
+
+testNo = 1
+
+# successors of the nodes of the search tree (breadth first), only the feasible ones are expanded
+def successors(grammar, goal):
+	queue = [grammar._init_search(goal)]
+	cnt = 0
+	for node in queue:
+		if node.tail is None:
+			continue
+		for rule in grammar.searchRules[node.tail.letter]:
+			child = grammar.create_successor(node, rule)
+			yield child
+			cnt += 1
+			if cnt == MAX_NODES:
+				return
+			if grammar.is_word_feasible(child, goal):
+				grammar.compute_precedence(child, goal)
+				queue.append(child)
+
+# the same word in new cells, without the parent
+def rescan(grammar, node, goal):
+	head, tail = grammar.split_word(node.word)
+	fresh = cTreeNode(head, tail, node.upperStrLen, node.lowerStrLen, node.ntLen, None, 0)
+	grammar.init_node(fresh, goal)
+	return fresh
+
+# parameters 1. grammar  2. input
+def runPrecedenceTest(grammar, goal):
+	global testNo
+	checked, failed = 0, []
+	for idx, (name, _) in enumerate(grammar.nodePrecedenceList):
+		grammar.currentNodePrecedence = idx
+		for node in successors(grammar, goal):
+			checked += 1
+			if grammar.compute_precedence(node, goal) != rescan(grammar, node, goal).precedence and name not in failed:
+				failed.append(name)
+	grammar.currentNodePrecedence = 5
+
+	status = RES_FAILED if failed else RES_OK
+	print(f'| TEST {testNo:3}  | {grammar.desc:35} | {goal:12} | PRECEDENCE | {checked:6} | {",".join(failed):20} | {status:16} |')
+	testNo += 1
+
+# parameters 1. grammar  2. input
+def runPruningTest(grammar, goal):
+	global testNo
+	checked, failed = 0, []
+	for node in successors(grammar, goal):
+		checked += 1
+		fresh = rescan(grammar, node, goal)
+		for pruningFunc, incrementalFunc in grammar.pruningIncremental.items():
+			if incrementalFunc(node, goal) != pruningFunc(fresh, goal) and pruningFunc.__name__ not in failed:
+				failed.append(pruningFunc.__name__)
+
+	status = RES_FAILED if failed else RES_OK
+	print(f'| TEST {testNo:3}  | {grammar.desc:35} | {goal:12} | PRUNING    | {checked:6} | {",".join(failed):20} | {status:16} |')
+	testNo += 1
+
+hline = f'|{"-"*11}|{"-"*37}|{"-"*14}|{"-"*12}|{"-"*8}|{"-"*22}|{"-"*9}|'
+
+print(hline)
+print(f'|{" "*11}| GRAMMAR{" "*29}| INPUT{" "*8}| CHECKED    | NODES  | FAILED IN{" "*11} | STATUS  |')
+print(hline)
+
+inputs = [(g1, 'aaaaaaa'), (g1, 'aaaaaa'), (g2, 'bbbabc'), (g3, 'bababc'), (g4, 'bbdgaa'), (g5, 'acactg'), (g6, 'aaabbb'), (g6, 'aaabbbb'),
+		  (g7, 'bbacabb'), (g8, 'babbab'), (g9, '10020110'), (g10, '0p0p0p0'), (g11, 'abaabaa'), (g12, 'rrdduurr'), (g12, 'rrdduuurr'),
+		  (g13, 'aaccbb'), (g14, 'abbcdd'), (g15, 'babcbab'), (g15, 'babcbba'), (g16, 'abba'), (g17, 'aaabbb'), (g18, 'lllrrr'),
+		  (g19, 'aacbb'), (g20, 'aabcdd')]
+
+for grammar, goal in inputs:
+	runPrecedenceTest(grammar, goal)
+
+for grammar, goal in inputs:
+	runPruningTest(grammar, goal)
+
+print(hline)
@@ -0,0 +1,51 @@
+# Author: Jan Hammer, xhamme00@stud.fit.vutbr.cz
+# Project: WK Grammar Tree Search
+# Testing of the RE pruning matcher - it must give the same results as searching the regex made from the word
+
+import sys
+sys.path.append("../")
+
+import re
+from lib.ctf_WK_grammar import *
+
+RES_OK = '\033[92m' + 'OK' + '\x1b[0m'
+RES_FAILED = '\033[91m' + 'FAILED' + '\x1b[0m'
+
+testNo = 1
+
+# parameters 1. the word  2. the input  3. expected result
+def runTest(word: tWord, goal: str, expected: bool) -> None:
+	global testNo
+	g = cWK_CFG(['A', 'B'], [], 'A' , [], [])
+	head, tail = g.split_word(g.compact_word(word))
+	node = cTreeNode(head, tail, 0, 0, 0, None, 0)
+	regexResult = re.compile(g._word_to_regex(node)).search(goal) is not None
+	actual = g.prune_check_regex(node, goal)
+	status = RES_OK if actual == expected and actual == regexResult else RES_FAILED
+	print(f'| TEST {testNo:2} | {wordToStr(word):30} | {goal:10} | {str(expected):8} | {str(actual):8} | {status:15}   |')
+	testNo += 1
+
+hline = '|---------|--------------------------------|------------|----------|----------|----------|'
+
+print(hline)
+print('|         |      WORD                      | INPUT      | EXPECTED | ACTUAL   | STATUS   |')
+print(hline)
+
+runTest(['A'],                                                       'abc',    True)
+runTest([(['a'], ['a']), 'A'],                                       'abc',    True)
+runTest([(['b'], ['b']), 'A'],                                       'abc',    False)
+runTest(['A', (['c'], ['c'])],                                       'abc',    True)
+runTest(['A', (['b'], ['b'])],                                       'abc',    False)
+runTest([(['a', 'b', 'c'], ['a', 'b', 'c'])],                         'abc',    True)
+runTest([(['a', 'b'], ['a', 'b'])],                                  'abc',    False)
+runTest(['A', (['b'], ['b']), 'B'],                                  'abc',    True)
+runTest(['A', (['c'], ['c']), 'B', (['b'], []), 'A'],                'abcab',  True)
+runTest(['A', (['c'], ['c']), 'B', (['c'], []), 'A'],                'abcab',  False)
+runTest([(['a'], []), 'A', (['b'], ['b']), 'B', (['b'], ['b'])],     'ab',     False)
+runTest([(['a'], []), 'A', (['b'], ['b']), 'B', (['b'], ['b'])],     'abb',    True)
+runTest([(['a'], []), 'A', 'B', (['a'], ['a'])],                     'aa',     True)
+runTest([(['a'], []), 'A', 'B', (['a'], ['a'])],                     'a',      False)
+runTest([([], ['a']), 'A', ([], ['b'])],                             'b',      True)
+runTest(['A', (['a', 'b'], []), 'B', (['b', 'c'], []), 'A'],         'abc',    False)
+
+print(hline)
@@ -0,0 +1,41 @@
+# Author: Jan Hammer, xhamme00@stud.fit.vutbr.cz
+# Project: WK Grammar Tree Search
+# Runs a test using all 20 grammars comparing performance of the tree search using different open lists (frontiers)
+# inputs are the starting inputs of the speed tests
+
+from lib.perf_tester import cPerfTester
+from lib.grammars import *
+from ts_speed_tests import testDataLst
+
+def main():
+	times = 1
+	tester = cPerfTester([frontier[0] for frontier in g1.frontierList])
+
+	#filter which tests will be run, each grammar has 4 (positive and negative input in basic form and in CNF)
+	runTests = range(1, len(testDataLst) * 4 + 1)
+	#runTests = [1, 2]
+
+	testNo = 0
+	for grammar, basicPosLen, _, basicNegLen, _, cnfPosLen, _, cnfNegLen, _ in testDataLst:
+		testNo += 1
+		if testNo in runTests:
+			tester.run_frontier_test(grammar, next(grammar.input_gen_func(basicPosLen, 0, True)), True, times)
+
+		testNo += 1
+		if testNo in runTests:
+			tester.run_frontier_test(grammar, next(grammar.input_gen_func(basicNegLen, 0, False)), False, times)
+
+		grammar.to_wk_cnf()
+
+		testNo += 1
+		if testNo in runTests:
+			tester.run_frontier_test(grammar, next(grammar.input_gen_func(cnfPosLen, 0, True)), True, times)
+
+		testNo += 1
+		if testNo in runTests:
+			tester.run_frontier_test(grammar, next(grammar.input_gen_func(cnfNegLen, 0, False)), False, times)
+
+	tester.printResults()
+
+if __name__ == "__main__":
+	main()
@@ -15,21 +15,24 @@ def main():
 	INPUT_START_LEN = 10
 	INPUT_STEP = 2
 
+	# the numpy implementation of WK-CYK gets much further (falls back to the basic one without numpy)
+	USE_NUMPY = False
+
 	#filter which tests will be run
 	runTests = range(1, len(allGrammars) * 2 + 1)
 	#runTests = [1, 6]
 
 	testNo = 0
 	for grammar in allGrammars:
-		grammar.to_wk_cnf()
+		grammar = grammar.get_wk_cnf()
 
 		testNo += 1
 		if testNo in runTests:
-			t.run_wk_cyk_test(grammar, grammar.input_gen_func(INPUT_START_LEN, INPUT_STEP, True), True)
+			t.run_wk_cyk_test(grammar, grammar.input_gen_func(INPUT_START_LEN, INPUT_STEP, True), True, USE_NUMPY)
 
 		testNo += 1
 		if testNo in runTests:
-			t.run_wk_cyk_test(grammar, grammar.input_gen_func(INPUT_START_LEN, INPUT_STEP, False), False)
+			t.run_wk_cyk_test(grammar, grammar.input_gen_func(INPUT_START_LEN, INPUT_STEP, False), False, USE_NUMPY)
 
 
 if __name__ == "__main__":